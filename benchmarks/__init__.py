@@ -0,0 +1 @@
+# Benchmarks for the typing test; run each one from the repository root, e.g. python -m benchmarks.tk_calls
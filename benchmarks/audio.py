@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# Key Click Dispatch Benchmark
+# Loads the key clicks with SDL's dummy audio driver (so it runs without a sound card) and replays key presses at steady
+# typing speeds and in bursts, reporting how long click() holds up the key handler and how long each click takes to
+# reach its mixer channel (dispatch latency), plus any clicks dropped for arriving too late.
+# Usage: python -m benchmarks.audio [--keys 400] [--wpm 80 150 250]
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy") # must be set before pygame is imported by the loader thread
+
+from key_audio import KeyClicks
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run(clicks, keys, interval): # presses keys at a fixed interval (0 for a burst) and returns the handler costs in nanoseconds
+    clicks.latencies.clear()
+    clicks.dropped = 0
+    handler = []
+    for i in range(keys):
+        before = time.perf_counter_ns()
+        clicks.click("asdfjkl; "[i % 9])
+        handler.append(time.perf_counter_ns() - before)
+        if interval:
+            time.sleep(interval)
+    time.sleep(0.2) # lets the dispatcher catch up
+    return sorted(handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures key click dispatch latency with the dummy audio driver.")
+    parser.add_argument("--keys", type=int, default=400)
+    parser.add_argument("--wpm", type=float, nargs="+", default=[80, 150, 250])
+    args = parser.parse_args()
+
+    clicks = KeyClicks()
+    start = time.perf_counter()
+    if not clicks.wait(30):
+        raise SystemExit(f"key clicks could not be loaded: {clicks.error}")
+    print(f"loaded {len(clicks.sounds)} clicks in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    print(f"{'stream':<12} {'keys':>6} {'handler p50 (us)':>17} {'handler p99 (us)':>17} {'dispatch p50 (us)':>18} {'dispatch p99 (us)':>18} {'dropped':>8}")
+    streams = [(f"{wpm:g} wpm", 60 / (wpm * 5)) for wpm in args.wpm] + [("burst", 0)]
+    for label, interval in streams:
+        handler = run(clicks, args.keys, interval)
+        dispatch = sorted(clicks.latencies)
+        print(f"{label:<12} {args.keys:>6} {percentile(handler, 0.5) / 1000:>17.1f} {percentile(handler, 0.99) / 1000:>17.1f} "
+              f"{percentile(dispatch, 0.5) / 1000:>18.1f} {percentile(dispatch, 0.99) / 1000:>18.1f} {clicks.dropped:>8}")
+    clicks.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+# Difficulty Classifier Benchmark
+# Classifies every paragraph and every passage of the full Babel text with the old two-regex path, the single-pass
+# compiled classifier and the NumPy batch classifier, checks that all three agree and reports how long each took.
+# Usage: python -m benchmarks.classifier [--repeat 5]
+
+import argparse
+import re
+import time
+
+from generate_passages import categorize_passage, categorize_passages, iter_paragraphs, split_paragraph
+
+BABEL_PATH = "R.-F.-Kuang-Babel.txt"
+EDGE_CASES = ["", " ", ".", "abc\n", "abc def.", "1", "café", "　", "、", "it's \"fine\"?", "tab\there", "\U0001F600"]
+
+
+def regex_categorize(passage): # the classifier generate_passages.py used before (up to two regex scans per passage)
+    if re.match(r'^[A-Za-z\s\.]+$', passage):
+        return 'easy'
+    elif re.match(r'^[A-Za-z0-9\s\.,\?!\'\"]+$', passage):
+        return 'medium'
+    else:
+        return 'hard'
+
+
+def best_time(function, argument, repeat): # fastest of several runs, in seconds
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the regex, single-pass and batch difficulty classifiers.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(BABEL_PATH, 'r', encoding='utf-8') as f:
+        paragraphs = list(iter_paragraphs(f))
+    passages = [chunk for para in paragraphs for chunk in split_paragraph(para)]
+
+    print(f"{'texts':<12} {'count':>7} {'regex (ms)':>11} {'single (ms)':>12} {'batch (ms)':>11}")
+    for label, texts in (("edge cases", EDGE_CASES), ("passages", passages), ("paragraphs", paragraphs)):
+        regex_time, expected = best_time(lambda items: [regex_categorize(t) for t in items], texts, args.repeat)
+        single_time, single = best_time(lambda items: [categorize_passage(t) for t in items], texts, args.repeat)
+        batch_time, batch = best_time(categorize_passages, texts, args.repeat)
+        if single != expected or batch != expected:
+            raise SystemExit(f"classifiers disagree on {label}")
+        print(f"{label:<12} {len(texts):>7} {regex_time * 1000:>11.2f} {single_time * 1000:>12.2f} {batch_time * 1000:>11.2f}")
+    print("all classifiers agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+# Paragraph Hand-off Check
+# Drives the typing test's key handler with stand-in widgets (so it runs without a display) through a test of several
+# paragraphs typed without a mistake, moving between paragraphs in the ways a real typist does: releasing the last key of
+# a paragraph before typing on, pressing space before the next paragraph, and pressing the next keys (with or without a
+# space) before releasing the last one. Every way should score 0 errors and log each character once at its own position.
+# Usage: python -m benchmarks.paragraph_handoff
+
+import sys
+
+import python_typing_test
+from python_typing_test import PythonTypingTestApp
+
+PARAGRAPHS = ["The quick brown fox.", "Jumps over the lazy dog.", "Pack my box with jugs.", "Five dozen liquor jugs."]
+
+
+class StandIn: # accepts and ignores any widget call
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class StandInVar: # stands in for a Tk variable
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class StandInEntry: # stands in for the hidden tk.Entry
+    def __init__(self):
+        self.text = ""
+
+    def get(self):
+        return self.text
+
+    def delete(self, first, last=None):
+        last = first + 1 if last is None else len(self.text) if last == 'end' else last
+        self.text = self.text[:first] + self.text[last:]
+
+    def insert(self, index, text):
+        self.text = self.text[:index] + text + self.text[index:]
+
+    def focus_set(self):
+        pass
+
+
+class HeadlessApp(PythonTypingTestApp): # the test without its windows
+    def setup_widgets(self):
+        self.difficulty = StandInVar("medium")
+        self.practice_weak_keys = StandInVar(False)
+        self.long_text = StandInVar(False)
+        self.display_text = StandIn()
+        self.renderer = StandIn()
+        self.hidden_input = StandInEntry()
+        self.progress = StandIn()
+
+    def show_instructions(self):
+        pass
+
+    def show_results(self):
+        self.results = (self.total_errors, self.total_chars)
+
+
+def type_test(handoff): # types PARAGRAPHS, moving between them as handoff says, and returns the app once the test has ended
+    python_typing_test.retrieve_quotation = lambda **kwargs: [(p, len(p.split())) for p in PARAGRAPHS]
+    app = HeadlessApp(StandIn())
+    for number, paragraph in enumerate(PARAGRAPHS):
+        keys = paragraph[1:] if number and handoff.startswith("overflow") else paragraph # the first key was already typed with the last one
+        for key in keys[:-1]:
+            app.hidden_input.insert(len(app.hidden_input.text), key)
+            app.on_key_press(None)
+        last = keys[-1]
+        if number + 1 < len(PARAGRAPHS):
+            if handoff == "overflow":
+                last += PARAGRAPHS[number + 1][0]
+            elif handoff == "overflow with space":
+                last += " " + PARAGRAPHS[number + 1][0]
+        app.hidden_input.insert(len(app.hidden_input.text), last)
+        app.on_key_press(None) # one release for every key pressed since the last one
+        if handoff == "space" and number + 1 < len(PARAGRAPHS):
+            app.hidden_input.insert(len(app.hidden_input.text), " ")
+            app.on_key_press(None)
+    return app
+
+
+def main():
+    expected = list(range(sum(len(p) for p in PARAGRAPHS)))
+    failed = False
+    for handoff in ("release first", "space", "overflow", "overflow with space"):
+        app = type_test(handoff)
+        errors, chars = app.results
+        positions = list(app.session.keystrokes.positions)
+        ok = errors == 0 and positions == expected
+        failed = failed or not ok
+        print(f"{handoff:<20} errors {errors}  chars {chars}  log positions {'match' if positions == expected else positions}  {'ok' if ok else 'FAILED'}")
+        app.history.close()
+        app.prefetcher.shutdown()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# Keystroke Replay Benchmark
+# Feeds keystroke streams through a headless TypingSession and reports events/sec plus p50/p99 per-event latency.
+# Streams are either synthetic (typing a passage with occasional mistakes and backspaces) or recorded
+# (a JSON file holding a list of [seconds, key] pairs, where key is a character or "BackSpace").
+# Passage lengths run from single typing-test passages up to whole chapters of Babel. Chapters are replayed both as one
+# passage and paragraph by paragraph, the way long-text mode feeds them (per-event latency should then stay flat).
+# Usage: python -m benchmarks.replay [--chapters 3] [--recorded stream.json --recorded-text passage.txt]
+
+import argparse
+import json
+import random
+import re
+import time
+
+from generate_passages import split_paragraph
+from typing_session import BACKSPACE, TypingSession
+
+BABEL_PATH = "R.-F.-Kuang-Babel.txt"
+PASSAGES_PATH = "typing_passages.json"
+
+
+def synthetic_stream(target, error_rate=0.05, wpm=80, seed=0): # yields (timestamp, key) events for typing the target text
+    rng = random.Random(seed)
+    seconds_per_key = 60 / (wpm * 5) # a "word" is five keystrokes
+    t = 0.0
+    position = 0
+    while position < len(target):
+        t += rng.expovariate(1 / seconds_per_key)
+        if rng.random() < error_rate: # makes a mistake, then fixes it with a backspace
+            yield t, rng.choice("abcdefghijklmnopqrstuvwxyz")
+            t += rng.expovariate(1 / seconds_per_key)
+            yield t, BACKSPACE
+            t += rng.expovariate(1 / seconds_per_key)
+        yield t, target[position]
+        position += 1
+
+
+def recorded_stream(path): # loads a recorded [seconds, key] stream
+    with open(path, 'r', encoding='utf-8') as f:
+        return [(float(t), key) for t, key in json.load(f)]
+
+
+def load_chapters(path=BABEL_PATH): # returns each chapter of Babel as one line of text, the way the display shows passages
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    chapters = re.split(r'^Chapter [A-Za-z\-]+$', text, flags=re.MULTILINE)[1:]
+    chapters = [' '.join(chapter.split()) for chapter in chapters]
+    return [chapter for chapter in chapters if len(chapter) > 5000] # skips the table of contents entries
+
+
+def load_passages(path=PASSAGES_PATH): # returns every passage from the generated passage file
+    with open(path, 'r', encoding='utf-8') as f:
+        passages = json.load(f)["passages"]
+    return [p for level in passages.values() for p in level]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def replay(target, events): # replays one stream and returns per-event latencies in nanoseconds
+    session = TypingSession(target, clock=lambda: 0.0)
+    latencies = []
+    clock = time.perf_counter_ns
+    for timestamp, key in events:
+        before = clock()
+        session.press(key, timestamp)
+        latencies.append(clock() - before)
+    session.finish(events[-1][0] if events else 0.0)
+    return session, latencies
+
+
+def replay_paragraphs(paragraphs, error_rate): # replays typing each paragraph in turn through one session, as long-text mode does
+    session = TypingSession(paragraphs[0], clock=lambda: 0.0)
+    latencies = []
+    clock = time.perf_counter_ns
+    t = 0.0
+    for number, paragraph in enumerate(paragraphs):
+        if number:
+            session.advance(paragraph)
+        for timestamp, key in synthetic_stream(paragraph, error_rate, seed=number):
+            before = clock()
+            session.press(key, t + timestamp)
+            latencies.append(clock() - before)
+        t += timestamp
+    session.finish(t)
+    return session, latencies
+
+
+def report(label, chars, result):
+    session, latencies = result
+    total_seconds = sum(latencies) / 1e9
+    latencies.sort()
+    rate = len(latencies) / total_seconds if total_seconds else 0
+    print(f"{label:<24} {chars:>9} {len(latencies):>9} {rate:>13,.0f} {percentile(latencies, 0.5) / 1000:>9.2f} {percentile(latencies, 0.99) / 1000:>9.2f} {session.accuracy():>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays keystroke streams through a headless TypingSession.")
+    parser.add_argument("--chapters", type=int, default=3, help="number of Babel chapters to replay as whole passages")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--recorded", help="JSON file with a recorded list of [seconds, key] events")
+    parser.add_argument("--recorded-text", help="text file holding the passage the recorded stream was typed against")
+    args = parser.parse_args()
+
+    print(f"{'stream':<24} {'chars':>9} {'events':>9} {'events/sec':>13} {'p50 (us)':>9} {'p99 (us)':>9} {'acc (%)':>8}")
+
+    passages = sorted(load_passages(), key=len)
+    for label, passage in (("shortest passage", passages[0]), ("median passage", passages[len(passages) // 2]), ("longest passage", passages[-1])):
+        report(label, len(passage), replay(passage, list(synthetic_stream(passage, args.error_rate))))
+
+    for number, chapter in enumerate(load_chapters()[:args.chapters], start=1):
+        report(f"Babel chapter {number}", len(chapter), replay(chapter, list(synthetic_stream(chapter, args.error_rate))))
+        paragraphs = list(split_paragraph(chapter))
+        report("  by paragraph", sum(len(p) for p in paragraphs), replay_paragraphs(paragraphs, args.error_rate))
+
+    if args.recorded:
+        with open(args.recorded_text, 'r', encoding='utf-8') as f:
+            target = f.read()
+        report("recorded stream", len(target), replay(target, recorded_stream(args.recorded)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+# Weakness Selector Benchmark
+# Builds stores and weakness indexes from the Babel passages repeated to several corpus sizes, then times picking practice
+# passages for random error profiles with the index and with a full scan that scores every passage. The index lookup
+# should stay flat as the corpus grows while the scan grows with it; both should agree on how well the best pick scores.
+# Also times the game's ordinary random pick of a test's passages, which should stay flat too.
+# Usage: python -m benchmarks.selector [--sizes 2000 20000 100000] [--queries 200]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from passage_index import PassageIndex, error_profile, passage_terms, write_index
+from passage_store import PassageStore, json_passage_pairs, write_store
+from python_typing_test import pick_passages
+
+JSON_PATH = "typing_passages.json"
+CHARACTERS = "abcdefghijklmnopqrstuvwxyz,.'"
+
+
+def scan_score(text, weights): # the score the index approximates, computed from the passage itself
+    terms = passage_terms(text)
+    return sum(weight * terms.get(term, 0) / len(text) for term, weight in weights.items())
+
+
+def random_profile(rng): # a few mistyped characters with made-up counts
+    return error_profile({char: rng.randint(1, 5) for char in rng.sample(CHARACTERS, rng.randint(1, 6))})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times weakness-index passage selection against a full scan.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-limit", type=int, default=20000, help="skip the full scan above this many passages")
+    args = parser.parse_args()
+
+    source = [passage for difficulty, passage in json_passage_pairs(JSON_PATH) if difficulty == "hard"]
+    print(f"{'passages':>9} {'build (s)':>10} {'index p50 (ms)':>15} {'index max (ms)':>15} {'random (ms)':>12} {'scan (ms)':>10} {'best score':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            store_path, index_path = os.path.join(tmp, f"{size}.bin"), os.path.join(tmp, f"{size}.idx")
+            start = time.perf_counter()
+            write_store(store_path, (("hard", source[i % len(source)]) for i in range(size)))
+            store = PassageStore(store_path)
+            write_index(index_path, store)
+            build = time.perf_counter() - start
+
+            index = PassageIndex(index_path)
+            rng = random.Random(size)
+            profiles = [random_profile(rng) for _ in range(args.queries)]
+            timings = []
+            for weights in profiles:
+                start = time.perf_counter()
+                index.select("hard", weights)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            start = time.perf_counter()
+            for _ in range(args.queries):
+                pick_passages(store["hard"], 3, "hard")
+            random_pick = (time.perf_counter() - start) / args.queries
+            found = sum(scan_score(store["hard"][index.select("hard", w)[0]], w) for w in profiles[:10]) / 10
+
+            scan_text = f"{'n/a':>10}"
+            best_text = f"{found:>11.4f}"
+            if size <= args.scan_limit:
+                passages = store["hard"][:]
+                start = time.perf_counter()
+                best = [max(scan_score(text, w) for text in passages) for w in profiles[:10]]
+                scan_text = f"{(time.perf_counter() - start) / 10 * 1000:>10.1f}"
+                best_text = f"{found:>5.4f}/{sum(best) / 10:.4f}"
+            print(f"{size:>9} {build:>10.1f} {timings[len(timings) // 2] * 1000:>15.3f} {timings[-1] * 1000:>15.3f} {random_pick * 1000:>12.4f} {scan_text} {best_text:>11}")
+            index.close()
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
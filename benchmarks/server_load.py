@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+# Typing Server Load Generator
+# Connects many simulated typists to typing_server.py at once. Each one joins a long-text test and types it (with
+# occasional mistakes and backspaces) at a steady speed, waiting for each key's acknowledgement before sending the next, like
+# a real keyboard would. One more connection follows the leaderboard. Reports sustained events/sec across all typists and
+# the round-trip latency of each key (p50 up to p99.9), which is what a typist would feel.
+# Usage: python -m benchmarks.server_load [--sessions 100] [--wpm 150] [--seconds 10] [--spawn] [--max-p99-ms 20]
+#        (--spawn starts a server in a subprocess; otherwise one must already be running at --host/--port)
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.replay import percentile, synthetic_stream
+from typing_server import HOST, PORT
+
+
+async def send(writer, message):
+    writer.write((json.dumps(message) + "\n").encode('utf-8'))
+
+
+async def typist(number, host, port, wpm, seconds, error_rate, latencies, counts): # one simulated typist; appends each key's round trip in nanoseconds
+    reader, writer = await asyncio.open_connection(host, port)
+    await send(writer, {"op": "join", "name": f"typist {number}", "difficulty": "hard", "long": True})
+    interval = 60 / (wpm * 5) if wpm else 0 # a "word" is five keystrokes
+    deadline = time.perf_counter() + seconds
+    seq = 0
+    next_key = time.perf_counter() + interval * (number % 10) / 10 # spreads the typists' keys out instead of sending them in lockstep
+    text = None
+    while time.perf_counter() < deadline:
+        while text is None: # waits for the next paragraph
+            message = json.loads(await reader.readline())
+            if message["op"] == "passage":
+                text = message["text"]
+        upcoming = None
+        for _, key in synthetic_stream(text, error_rate, seed=number + seq):
+            if interval:
+                await asyncio.sleep(max(0, next_key - time.perf_counter()))
+                next_key += interval
+            seq += 1
+            sent = time.perf_counter_ns()
+            await send(writer, {"op": "key", "key": key, "seq": seq})
+            while True: # the ack may come after a new passage or other messages
+                reply = json.loads(await reader.readline())
+                if reply["op"] == "passage": # a mistake on the last character also finishes a paragraph, so the server can move on early
+                    upcoming = reply["text"]
+                elif reply["op"] == "ack" and reply["seq"] == seq:
+                    break
+            latencies.append(time.perf_counter_ns() - sent)
+            if upcoming is not None or time.perf_counter() >= deadline:
+                break
+        text = upcoming
+    await send(writer, {"op": "end"})
+    while json.loads(await reader.readline())["op"] != "results":
+        pass
+    counts["finished"] += 1
+    writer.close()
+
+
+async def observer(host, port, seconds, counts): # follows the leaderboard for the length of the run
+    reader, writer = await asyncio.open_connection(host, port)
+    await send(writer, {"op": "leaderboard"})
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            message = json.loads(await asyncio.wait_for(reader.readline(), deadline - time.perf_counter()))
+        except asyncio.TimeoutError:
+            break
+        if message["op"] == "leaderboard":
+            counts["leaderboard"] += 1
+            counts["typists"] = message["typists"]
+    writer.close()
+
+
+async def run(args):
+    latencies = []
+    counts = {"finished": 0, "leaderboard": 0, "typists": 0}
+    start = time.perf_counter()
+    await asyncio.gather(observer(args.host, args.port, args.seconds, counts),
+                         *(typist(i, args.host, args.port, args.wpm, args.seconds, args.error_rate, latencies, counts) for i in range(args.sessions)))
+    return latencies, counts, time.perf_counter() - start
+
+
+async def wait_for_server(host, port, timeout=30): # retries connecting until the spawned server is listening
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drives many simulated typists against the typing server.")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--wpm", type=float, default=150, help="typing speed of each typist (0 sends each key as soon as the last one is acknowledged)")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--spawn", action="store_true", help="start a server in a subprocess for the run")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="exit with an error if the p99 round trip is above this")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, "typing_server.py", "--host", args.host, "--port", str(args.port)], stdout=subprocess.DEVNULL)
+    try:
+        if server is not None:
+            asyncio.run(wait_for_server(args.host, args.port))
+        latencies, counts, elapsed = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    print(f"{args.sessions} typists at {args.wpm:g} wpm for {elapsed:.1f} s: {len(latencies)} keys, {len(latencies) / elapsed:,.0f} events/sec sustained")
+    print(f"round trip (ms): p50 {percentile(latencies, 0.5) / 1e6:.2f}  p90 {percentile(latencies, 0.9) / 1e6:.2f}  "
+          f"p99 {percentile(latencies, 0.99) / 1e6:.2f}  p99.9 {percentile(latencies, 0.999) / 1e6:.2f}  max {(latencies[-1] if latencies else 0) / 1e6:.2f}")
+    print(f"{counts['finished']} tests finished; {counts['leaderboard']} leaderboard updates received (last one showed {counts['typists']} typists)")
+    p99 = percentile(latencies, 0.99) / 1e6
+    if args.max_p99_ms is not None and p99 > args.max_p99_ms:
+        print(f"p99 round trip {p99:.2f} ms is above the {args.max_p99_ms} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# Startup Benchmark
+# Starts python_typing_test.py in fresh processes and measures how long it takes to import the module and to show the
+# first interactive window (main window built and drawn). "Cold" runs start with an empty bytecode cache; "warm" runs
+# reuse the cache left by the previous run. Without a display only the import time can be measured.
+# Usage: python -m benchmarks.startup [--runs 5] [--max-import-ms 500] [--max-window-ms 1500]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import python_typing_test
+imported = time.perf_counter()
+heavy = sorted(m for m in ("numpy", "matplotlib", "pygame") if m in sys.modules)
+window = None
+try:
+    import tkinter as tk
+    root = tk.Tk()
+except tk.TclError: # no display available
+    root = None
+if root is not None:
+    app = python_typing_test.PythonTypingTestApp(root)
+    root.update() # draws the window and processes pending events, so the user could start typing now
+    window = time.perf_counter() - start
+    root.destroy()
+print(json.dumps({"import": imported - start, "window": window, "heavy": heavy}))
+"""
+
+
+def run_probe(pycache_dir): # runs one fresh interpreter and returns its timings
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache_dir)
+    env.pop("PYTHONDONTWRITEBYTECODE", None) # otherwise no cache is ever written and "warm" runs are cold ones too
+    output = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(label, results):
+    imports = [r["import"] * 1000 for r in results]
+    windows = [r["window"] * 1000 for r in results if r["window"] is not None]
+    window_text = f"{statistics.median(windows):>10.1f}" if windows else f"{'n/a':>10}"
+    print(f"{label:<6} {statistics.median(imports):>10.1f} {max(imports):>10.1f} {window_text}   {', '.join(results[-1]['heavy']) or 'none'}")
+    return statistics.median(imports), (statistics.median(windows) if windows else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures cold and warm startup of the typing test.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None, help="exit with an error if the warm median import time is above this")
+    parser.add_argument("--max-window-ms", type=float, default=None, help="exit with an error if the warm median time to the first window is above this")
+    args = parser.parse_args()
+
+    print(f"{'run':<6} {'import p50':>10} {'import max':>10} {'window p50':>10}   heavy modules loaded at startup")
+    cold = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as pycache_dir: # a new, empty bytecode cache every time
+            cold.append(run_probe(pycache_dir))
+    summarize("cold", cold)
+
+    with tempfile.TemporaryDirectory() as pycache_dir:
+        run_probe(pycache_dir) # fills the cache
+        warm = [run_probe(pycache_dir) for _ in range(args.runs)]
+    import_ms, window_ms = summarize("warm", warm)
+
+    failed = False
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"import time {import_ms:.1f} ms is above the {args.max_import_ms} ms budget")
+        failed = True
+    if args.max_window_ms is not None and window_ms is not None and window_ms > args.max_window_ms:
+        print(f"time to first window {window_ms:.1f} ms is above the {args.max_window_ms} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
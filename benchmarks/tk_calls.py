@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# Tk Calls per Keystroke
+# Replays typing a passage (with occasional mistakes and backspaces) through the old full-redraw highlighting and through
+# the scoring engine + coalesced renderer, and counts the widget calls each one makes. Every widget call is one Tcl round-trip.
+# Usage: python -m benchmarks.tk_calls [--lengths 100 300 600 2000] [--error-rate 0.05]
+
+import argparse
+import random
+
+from tag_renderer import TagRenderer
+from typing_engine import ScoringEngine
+
+
+class CountingText: # stands in for tk.Text and counts the calls that would reach Tcl
+    def __init__(self):
+        self.calls = 0
+
+    def config(self, **options):
+        self.calls += 1
+
+    def delete(self, *indices):
+        self.calls += 1
+
+    def insert(self, *args):
+        self.calls += 1
+
+    def tag_add(self, tag, *indices):
+        self.calls += 1
+
+    def tag_remove(self, tag, *indices):
+        self.calls += 1
+
+    def see(self, index):
+        self.calls += 1
+
+
+def keystroke_snapshots(target, error_rate, seed=0): # yields the hidden input's contents after each key event
+    rng = random.Random(seed)
+    typed = ""
+    while len(typed) < len(target):
+        if rng.random() < error_rate: # makes a mistake, then fixes it with a backspace
+            typed += rng.choice("abcdefghijklmnopqrstuvwxyz")
+            yield typed
+            typed = typed[:-1]
+            yield typed
+        typed += target[len(typed)]
+        yield typed
+
+
+def legacy_render(widget, typed_text, target_text): # the highlighting that on_key_press used to do on every key release
+    widget.config(state='normal')
+    widget.tag_remove("correct", "1.0", "end")
+    widget.tag_remove("incorrect", "1.0", "end")
+    widget.config(state='disabled')
+    min_len = min(len(typed_text), len(target_text))
+    for i in range(min_len):
+        tag = "correct" if typed_text[i] == target_text[i] else "incorrect"
+        widget.tag_add(tag, f"1.{i}", f"1.{i+1}")
+    for i in range(len(target_text), len(typed_text)):
+        widget.tag_add("incorrect", f"1.{i}", f"1.{i+1}")
+    widget.config(state='normal')
+    widget.tag_remove("cursor", "1.0", "end")
+    if len(typed_text) < len(target_text):
+        widget.tag_add("cursor", f"1.{len(typed_text)}", f"1.{len(typed_text) + 1}")
+    widget.config(state='disabled')
+
+
+def incremental_render(renderer, scorer, typed_text): # the highlighting on_key_press does now
+    delta = scorer.update(typed_text)
+    cursor = len(typed_text) if len(typed_text) < len(scorer.target) else None
+    renderer.render(delta, cursor_index=cursor)
+
+
+def measure(target, error_rate): # returns (events, legacy calls, incremental calls)
+    snapshots = list(keystroke_snapshots(target, error_rate))
+
+    legacy = CountingText()
+    for typed in snapshots:
+        legacy_render(legacy, typed, target)
+
+    widget = CountingText()
+    renderer = TagRenderer(widget)
+    scorer = ScoringEngine(target)
+    for typed in snapshots:
+        incremental_render(renderer, scorer, typed)
+
+    return len(snapshots), legacy.calls, widget.calls
+
+
+def sample_passage(length): # builds a passage of the requested length from Babel-style prose
+    words = ("the translation of silver bars into meaning was never a simple matter for the scholars of the tower "
+             "who worked late into the night over their dictionaries").split()
+    rng = random.Random(length)
+    text = ""
+    while len(text) < length:
+        text += rng.choice(words) + " "
+    return text[:length]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Counts Tk calls per keystroke before and after coalesced rendering.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 300, 600, 2000])
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'chars':>7} {'events':>7} {'legacy calls/key':>17} {'new calls/key':>14} {'legacy max/key':>15}")
+    for length in args.lengths:
+        target = sample_passage(length)
+        events, legacy_calls, new_calls = measure(target, args.error_rate)
+        worst = len(target) + 8 # the legacy path's last keystroke re-tags every character plus its fixed toggles
+        print(f"{length:>7} {events:>7} {legacy_calls / events:>17.1f} {new_calls / events:>14.2f} {worst:>15}")
+
+
+if __name__ == "__main__":
+    main()
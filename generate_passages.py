@@ -1,5 +1,18 @@
+import argparse
+import hashlib
+import io
 import json
+import os
 import re
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from passage_index import write_index
+from passage_store import PassageStore, write_store
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
 
 # Generates Passages from Babel for Typing Test (D = Tenzin; O = Ariella)
 def load_text_file(path): # opens a file given the path provided
@@ -7,47 +20,270 @@ def load_text_file(path): # opens a file given the path provided
         return f.read() # returns file as a string
 
 
+# Difficulty Classification
+# Every character has a difficulty level: 0 for letters, periods and whitespace (easy), 1 for digits and basic punctuation
+# (medium), 2 for anything else (hard). A passage's difficulty is the highest level of any of its characters, which gives the
+# same answer as matching the easy regex r'^[A-Za-z\s\.]+$' and then the medium regex r'^[A-Za-z0-9\s\.,\?!\'\"]+$', but in one scan.
+EASY_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz.' # paragraphs with just the English alphabet and periods (plus whitespace)
+MEDIUM_CHARS = '0123456789,?!\'"' # moderate-length passages with basic punctuation
+LAST_SPACE = 0x3000 # highest code point that counts as whitespace (\s); everything above it that is not listed is hard
+DIFFICULTY_PATTERN = re.compile(r'[A-Za-z\s.]*(?:([0-9,?!\'"])[A-Za-z0-9\s.,?!\'"]*)?') # easy characters, then (if a medium character turns up) easy or medium ones; stops at the first hard character
+CHAR_LEVELS = bytes(0 if chr(cp) in EASY_CHARS or chr(cp).isspace() else 1 if chr(cp) in MEDIUM_CHARS else 2 for cp in range(LAST_SPACE + 1)) # lookup table from code point to difficulty level
+
 def categorize_passage(passage): # groups passages according to difficulty
-    if re.match(r'^[A-Za-z\s\.]+$', passage): # paragraphs with just the English alphabet and periods
-        return 'easy'
-    elif re.match(r'^[A-Za-z0-9\s\.,\?!\'\"]+$', passage): # moderate-length passages with basic punctuation
-        return 'medium'
-    else: # paragraphs with other special characters included
+    match = DIFFICULTY_PATTERN.fullmatch(passage)
+    if match is None or not passage: # paragraphs with other special characters included (an empty passage is also hard)
         return 'hard'
-    
-def split_into_passages(text, max_length=600, min_length=200): # separates Babel (text from which we drew passages) into 200- to 600-character passages that users can type
-    paragraphs = [p.strip().replace('\n', ' ') for p in text.split('\n\n') if p.strip()] # splits text into paragraphs and allows user to type a space instead of a line break; all blank space except for singular spaces are not considered within the function
-    passages = {'easy': [], 'medium': [], 'hard': []} # stores all passages
-
-    for para in paragraphs: # for each paragraph
-        chunks = [] # separates into smaller parts
-        if len(para) <= max_length: # if paragraph is at most 600 characters (the maximum length for a paragraph within this typing test)
-            if len(para) >= min_length: # if paragraph is at least 200 characters (the minimum length for n paragraph within this typing test)
-                chunks.append(para) # paragraph is used
+    return 'medium' if match.lastindex else 'easy' # the group only matches once a digit or basic punctuation mark was seen
+
+def categorize_passages(passages): # classifies many passages at once, vectorized with NumPy over one concatenated code-point array
+    try:
+        import numpy as np
+    except ImportError: # NumPy is optional for building passages
+        return [categorize_passage(p) for p in passages]
+
+    passages = list(passages)
+    if not passages:
+        return []
+    code_points = np.frombuffer(''.join(passages).encode('utf-32-le'), dtype=np.uint32)
+    table = np.frombuffer(CHAR_LEVELS, dtype=np.uint8)
+    levels = np.where(code_points <= LAST_SPACE, table[np.minimum(code_points, LAST_SPACE)], 2).astype(np.uint8)
+
+    lengths = np.fromiter((len(p) for p in passages), dtype=np.int64, count=len(passages))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    non_empty = lengths > 0
+    passage_levels = np.full(len(passages), 2, dtype=np.uint8) # empty passages stay hard
+    if non_empty.any():
+        passage_levels[non_empty] = np.maximum.reduceat(levels, starts[non_empty]) # highest level within each passage
+    return [DIFFICULTIES[level] for level in passage_levels]
+
+def iter_paragraphs(lines): # lazily reads paragraphs (separated by blank lines) from a file or any other iterable of lines
+    para_lines = [] # lines of the paragraph currently being read
+    for line in lines:
+        line = line.rstrip('\n')
+        if line: # line belongs to the current paragraph
+            para_lines.append(line)
+        elif para_lines: # a blank line ends the paragraph
+            para = '\n'.join(para_lines).strip().replace('\n', ' ') # allows user to type a space instead of a line break; all blank space except for singular spaces are not considered
+            if para:
+                yield para
+            para_lines = []
+    if para_lines: # last paragraph of the file
+        para = '\n'.join(para_lines).strip().replace('\n', ' ')
+        if para:
+            yield para
+
+def split_paragraph(para, max_length=600, min_length=200): # yields the 200- to 600-character chunks of one paragraph
+    if len(para) <= max_length: # if paragraph is at most 600 characters (the maximum length for a paragraph within this typing test)
+        if len(para) >= min_length: # if paragraph is at least 200 characters (the minimum length for a paragraph within this typing test)
+            yield para # paragraph is used
+        return
+
+    parts = [] # sentences in the current chunk (joined once the chunk is complete, rather than growing a string sentence by sentence)
+    length = 0 # length of the current chunk
+    for s in para.split('. '): # splits paragraph into sentences
+        sentence = s + '. ' # adds back period at the end of each sentence that was removed during the splitting process
+        if length + len(sentence) < max_length: # if adding a new sentence still allows the paragraph to be at most 600 characters
+            parts.append(sentence) # sentence is added to chunk
+            length += len(sentence)
         else:
-            sentences = para.split('. ') # splits paragraph into sentences
-            chunk = "" # initializes string for each chunk (which will eventually comprise a new paragraph)
-            for s in sentences: # for each sentence
-                sentence = s + '. ' # adds back period at the end of each sentence that was removed during the splitting process
-                if len(chunk) + len(sentence) < max_length: # if adding a new sentence still allows the paragraph to be at most 600 characters (the maximum length for a paragraph within this typing test)
-                    chunk += sentence # sentence is added to chunk
-                else:
-                    if len(chunk.strip()) >= min_length: # if adding a new sentence causes the paragraph to be at least 200 characters (the minimum length for a paragraph within this typing test)
-                        chunks.append(chunk.strip()) # chunk is used, with extra spaces removed
-                    chunk = sentence # new chunk begins with added sentence
-            if chunk.strip() and len(chunk.strip()) >= min_length: # if chunk is at least 200 characters and some text is left in chunk
-                chunks.append(chunk.strip()) # added as final chunk
-
-        for chunk in chunks: # for each chunk
-            difficulty = categorize_passage(chunk) # assigned a difficulty level
-            passages[difficulty].append(chunk) # chunk (passage) stored
+            chunk = ''.join(parts).strip()
+            if len(chunk) >= min_length: # if the chunk is at least 200 characters
+                yield chunk # chunk is used, with extra spaces removed
+            parts = [sentence] # new chunk begins with added sentence
+            length = len(sentence)
+    chunk = ''.join(parts).strip()
+    if chunk and len(chunk) >= min_length: # if chunk is at least 200 characters and some text is left in chunk
+        yield chunk # added as final chunk
+
+def iter_passages(paragraphs, max_length=600, min_length=200): # yields (difficulty, passage) pairs for a stream of paragraphs
+    for para in paragraphs:
+        for chunk in split_paragraph(para, max_length, min_length):
+            yield categorize_passage(chunk), chunk # chunk (passage) assigned a difficulty level
 
+def split_into_passages(text, max_length=600, min_length=200): # separates Babel (text from which we drew passages) into 200- to 600-character passages that users can type
+    passages = {difficulty: [] for difficulty in DIFFICULTIES} # stores all passages
+    for difficulty, chunk in iter_passages(iter_paragraphs(io.StringIO(text)), max_length, min_length):
+        passages[difficulty].append(chunk)
     return passages
 
+def passages_from_file(path, max_length=600, min_length=200): # splits one source file, reading it a line at a time
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(iter_passages(iter_paragraphs(f), max_length, min_length))
+
+def iter_source_files(inputs): # expands the given files and directories into the text files to read (directories are searched recursively)
+    for path in inputs:
+        if os.path.isdir(path):
+            for folder, subfolders, files in os.walk(path):
+                subfolders.sort()
+                for name in sorted(files):
+                    if name.endswith('.txt'):
+                        yield os.path.join(folder, name)
+        else:
+            yield path
+
+def iter_file_passages(paths, max_length=600, min_length=200, workers=None): # yields (path, passages) for each source file, in order
+    paths = iter(paths)
+    if workers == 1: # no process pool for single-worker builds
+        for path in paths:
+            yield path, passages_from_file(path, max_length, min_length)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        window = deque() # only a few files are in flight at once, so results do not pile up while an early file is still being read
+        limit = 2 * workers
+        for path in paths:
+            window.append((path, executor.submit(passages_from_file, path, max_length, min_length)))
+            if len(window) >= limit:
+                done_path, future = window.popleft()
+                yield done_path, future.result()
+        while window:
+            done_path, future = window.popleft()
+            yield done_path, future.result()
+
+class PassageWriter: # writes passages to the JSON file as they arrive, spooling each difficulty to its own temporary file
+    def __init__(self, out_file='typing_passages.json'):
+        self.out_file = out_file
+        self.spool_dir = tempfile.mkdtemp(prefix='passages-')
+        self.spools = {d: open(os.path.join(self.spool_dir, d), 'w+', encoding='utf-8') for d in DIFFICULTIES}
+        self.counts = {d: 0 for d in DIFFICULTIES}
+
+    def add(self, difficulty, passage): # appends one passage (already JSON-encoded, one per line) to its difficulty's spool
+        self.spools[difficulty].write(json.dumps(passage) + '\n')
+        self.counts[difficulty] += 1
+
+    def close(self): # copies the spools into the output file in the same layout as json.dump(..., indent=2)
+        tmp_file = self.out_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as out:
+            out.write('{\n  "passages": {')
+            for i, difficulty in enumerate(DIFFICULTIES):
+                spool = self.spools[difficulty]
+                spool.seek(0)
+                out.write(',' if i else '')
+                out.write(f'\n    "{difficulty}": ')
+                if not self.counts[difficulty]:
+                    out.write('[]')
+                    continue
+                out.write('[')
+                for j, line in enumerate(spool):
+                    out.write(',' if j else '')
+                    out.write('\n      ' + line.rstrip('\n'))
+                out.write('\n    ]')
+            out.write('\n  }\n}')
+        os.replace(tmp_file, self.out_file) # the old output stays intact until the new one is complete
+        self.discard()
+
+    def discard(self):
+        for spool in self.spools.values():
+            spool.close()
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
 def save_as_json(passages, out_file='typing_passages.json'): # saves data to output file
     with open(out_file, 'w', encoding='utf-8') as f: # opens file: writes over it if it has already been opened, correctly encodes file to ensure that non-alphanumeric characters are properly displayed, and exits from file once data have been added to it
         json.dump({"passages": passages}, f, indent=2) # converts Python object to JSON string to ensure that it can be added to file
 
-text = load_text_file("R.-F.-Kuang-Babel.txt") # generates text file from Babel and returns it as a string
-passages = split_into_passages(text) # chunked passages processed and stored
-save_as_json(passages, out_file='typing_passages.json') # saves passages as JSON file
\ No newline at end of file
+# Incremental Rebuilds
+# Each source file's passages are cached under its content hash, and a manifest records the hash of every file used in
+# the last build. A rebuild only splits files that are new or changed; everything else is read back from the cache.
+MANIFEST_VERSION = 1
+CACHE_FILE_PATTERN = re.compile(r'[0-9a-f]{64}-\d+-\d+\.jsonl(\.tmp)?|manifest\.json\.tmp') # names of the files the cache writes (entries and interrupted writes), the only ones pruning may delete
+
+def hash_file(path): # sha256 of a file's contents, read in blocks so large books are never held in memory
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(cache_dir): # returns the manifest from the previous build (empty if there was none or it is unreadable)
+    try:
+        with open(os.path.join(cache_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return manifest if manifest.get('version') == MANIFEST_VERSION else {}
+
+def save_manifest(cache_dir, manifest):
+    tmp_file = os.path.join(cache_dir, 'manifest.json.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, os.path.join(cache_dir, 'manifest.json'))
+
+def cache_entry_path(cache_dir, digest, max_length, min_length): # cached passages depend on the file's contents and the length limits
+    return os.path.join(cache_dir, f'{digest}-{max_length}-{min_length}.jsonl')
+
+def build_passages(inputs, out_file='typing_passages.json', max_length=600, min_length=200, workers=None, cache_dir=None, rebuild=False, store_file=None): # builds the passage JSON file and indexed store from any number of books, reprocessing only changed ones
+    store_file = store_file or os.path.splitext(out_file)[0] + '.bin' # the game memory-maps this store instead of parsing the JSON
+    index_file = os.path.splitext(store_file)[0] + '.idx' # weakness index over the store, used to pick practice passages
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(out_file)), '.passage_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    previous = {} if rebuild else load_manifest(cache_dir)
+    previous_files = previous.get('files', {})
+
+    files = {} # path -> size, modification time and content hash of every source file in this build
+    for path in iter_source_files(inputs):
+        stat = os.stat(path)
+        entry = previous_files.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns: # unchanged since last build, so the file is not even re-read for hashing
+            digest = entry['sha256']
+        else:
+            digest = hash_file(path)
+        files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+
+    stale = [path for path, entry in files.items() if rebuild or not os.path.exists(cache_entry_path(cache_dir, entry['sha256'], max_length, min_length))]
+    for path, file_passages in iter_file_passages(stale, max_length, min_length, workers): # splits only new or changed files
+        entry_path = cache_entry_path(cache_dir, files[path]['sha256'], max_length, min_length)
+        with open(entry_path + '.tmp', 'w', encoding='utf-8') as f:
+            for difficulty, chunk in file_passages:
+                f.write(json.dumps([difficulty, chunk]) + '\n')
+        os.replace(entry_path + '.tmp', entry_path)
+
+    options = {'max_length': max_length, 'min_length': min_length}
+    unchanged = (not stale and previous.get('options') == options and previous.get('out_file') == os.path.abspath(out_file)
+                 and previous.get('store_file') == os.path.abspath(store_file) and list(previous_files) == list(files)
+                 and os.path.exists(out_file) and os.path.exists(store_file) and os.path.exists(index_file))
+    if unchanged: # nothing to merge, so the existing output is left as it is
+        counts = previous['counts']
+    else:
+        writer = PassageWriter(out_file)
+        def merged_passages(): # merges cached and freshly split passages in input order, feeding the JSON writer and the store together
+            for path, entry in files.items():
+                with open(cache_entry_path(cache_dir, entry['sha256'], max_length, min_length), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        difficulty, chunk = json.loads(line)
+                        writer.add(difficulty, chunk)
+                        yield difficulty, chunk
+        try:
+            write_store(store_file, merged_passages(), DIFFICULTIES)
+        except BaseException:
+            writer.discard()
+            raise
+        writer.close()
+        counts = writer.counts
+        store = PassageStore(store_file)
+        write_index(index_file, store)
+        store.close()
+
+    save_manifest(cache_dir, {'version': MANIFEST_VERSION, 'options': options, 'out_file': os.path.abspath(out_file), 'store_file': os.path.abspath(store_file), 'files': files, 'counts': counts})
+    keep = {os.path.basename(cache_entry_path(cache_dir, entry['sha256'], max_length, min_length)) for entry in files.values()} | {'manifest.json'}
+    for name in os.listdir(cache_dir): # removes cache entries for files that have since changed or been dropped (anything else in the directory is left alone)
+        path = os.path.join(cache_dir, name)
+        if name not in keep and CACHE_FILE_PATTERN.fullmatch(name) and os.path.isfile(path):
+            os.remove(path)
+    return counts, len(stale)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds typing test passages from one or more books.")
+    parser.add_argument("inputs", nargs="*", default=["R.-F.-Kuang-Babel.txt"], help="text files, or directories of .txt files (default: Babel)")
+    parser.add_argument("-o", "--out-file", default="typing_passages.json")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: one per CPU; 1 disables the pool)")
+    parser.add_argument("--max-length", type=int, default=600)
+    parser.add_argument("--min-length", type=int, default=200)
+    parser.add_argument("--store-file", default=None, help="indexed passage store the game loads (default: the output name with a .bin extension)")
+    parser.add_argument("--cache-dir", default=None, help="where the build manifest and per-file passage cache live (default: .passage_cache next to the output)")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the cache and reprocess every file")
+    args = parser.parse_args()
+
+    counts, processed = build_passages(args.inputs, args.out_file, args.max_length, args.min_length, args.workers, args.cache_dir, args.rebuild, args.store_file) # chunked passages processed and saved as a JSON file
+    print(f"{processed} file(s) processed; " + ", ".join(f"{count} {difficulty}" for difficulty, count in counts.items()) + " passages in " + args.out_file + " and its store")
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# Handler Instrumentation
+# Opt-in timing for the typing test's Tk handlers (python python_typing_test.py --instrument [DIR]). When it is off
+# nothing is wrapped, so the test runs exactly as before. When it is on, each instrumented method records its call count,
+# run time and a latency histogram, plus how long its event waited in the Tk queue before the handler ran:
+#   - key events: estimated from the event's X server timestamp, taking the smallest gap seen as "no wait" (the two clocks
+#     have different origins, so only the difference is meaningful)
+#   - after() callbacks: how late the callback ran compared with when it was scheduled
+# Every instrumented call also runs under one cProfile.Profile and is kept as a span, so a session can be exported as a
+# pstats file (python -m pstats, snakeviz), a Chrome trace event file of the handler spans (chrome://tracing, Perfetto or
+# speedscope show it as a flame chart) and a JSON summary that `python instrumentation.py SUMMARY --budget-ms 16` checks
+# against a frame budget. DebugOverlay shows the same figures live in the corner of the window.
+
+FRAME_BUDGET_MS = 16 # a handler that takes (or waits) longer than this drops a frame at 60 Hz
+HISTOGRAM_EDGES_US = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 33000, 66000) # upper bucket edges in microseconds (the last bucket is unbounded)
+SAMPLES_KEPT = 10000 # most recent durations kept per handler for exact percentiles
+SPANS_KEPT = 100000 # most recent handler calls kept for the trace export
+HANDLERS = ("on_key_down", "on_key_press", "update_stats", "load_paragraph", "next_paragraph", "reset_test", "end_test", "show_results")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LatencyStats: # call count, histogram and recent samples for one handler (or its queue delay)
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.over_budget = 0 # calls longer than the frame budget
+        self.histogram = [0] * (len(HISTOGRAM_EDGES_US) + 1)
+        self.samples = deque(maxlen=SAMPLES_KEPT)
+
+    def add(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        self.max_ns = max(self.max_ns, ns)
+        if ns > FRAME_BUDGET_MS * 1_000_000:
+            self.over_budget += 1
+        us = ns / 1000
+        bucket = 0
+        while bucket < len(HISTOGRAM_EDGES_US) and us > HISTOGRAM_EDGES_US[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+        self.samples.append(ns)
+
+    def summary(self): # figures in milliseconds
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0,
+            "p50_ms": percentile(ordered, 0.5) / 1e6,
+            "p99_ms": percentile(ordered, 0.99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+            "over_budget": self.over_budget,
+            "histogram_us": {f"<={edge}": n for edge, n in zip(HISTOGRAM_EDGES_US, self.histogram)} | {f">{HISTOGRAM_EDGES_US[-1]}": self.histogram[-1]},
+        }
+
+
+class Instrumentation: # records handler timings for one run of the test
+    def __init__(self, profile=True):
+        self.handlers = {} # handler name -> LatencyStats of its run time
+        self.queued = {} # handler name -> LatencyStats of the time its event waited before it ran
+        self.spans = deque(maxlen=SPANS_KEPT) # (name, start ns, duration ns) of recent calls, for the trace export
+        self.profiler = cProfile.Profile() if profile else None
+        self.started_ns = time.perf_counter_ns()
+        self.event_offset_ms = None # smallest (local clock - X server timestamp) seen, taken as an event that did not wait
+        self.depth = 0 # nesting of instrumented calls (only the outermost one switches the profiler on and off)
+        self.thread = threading.get_ident() # Tk handlers all run on the thread that created the window
+
+    def _stats(self, table, name):
+        if name not in table:
+            table[name] = LatencyStats()
+        return table[name]
+
+    def record_queue_delay(self, name, ns):
+        self._stats(self.queued, name).add(max(0, ns))
+
+    def _event_delay(self, name, event): # estimates how long a Tk event waited before its handler ran
+        event_time = getattr(event, "time", None)
+        if not isinstance(event_time, int) or event_time <= 0:
+            return
+        gap = time.monotonic() * 1000 - event_time
+        if self.event_offset_ms is None or gap < self.event_offset_ms:
+            self.event_offset_ms = gap
+        self.record_queue_delay(name, round((gap - self.event_offset_ms) * 1_000_000))
+
+    def wrap(self, name, function): # the function with its calls timed (and profiled) under name
+        @functools.wraps(function)
+        def instrumented(*args, **kwargs):
+            if threading.get_ident() != self.thread: # only the Tk thread is measured
+                return function(*args, **kwargs)
+            if len(args) > 1 and hasattr(args[1], "widget"): # a bound handler called with a Tk event
+                self._event_delay(name, args[1])
+            outermost = self.depth == 0
+            self.depth += 1
+            if outermost and self.profiler is not None:
+                self.profiler.enable()
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter_ns() - start
+                if outermost and self.profiler is not None:
+                    self.profiler.disable()
+                self.depth -= 1
+                self._stats(self.handlers, name).add(duration)
+                self.spans.append((name, start, duration))
+        return instrumented
+
+    def instrument_class(self, cls, names=HANDLERS): # wraps the named methods of a class (before any instance is made, so bindings pick up the wrappers)
+        for name in names:
+            if hasattr(cls, name):
+                setattr(cls, name, self.wrap(name, getattr(cls, name)))
+
+    def instrument_after(self, widget): # makes widget.after record how late each callback runs compared with when it was scheduled
+        original_after = widget.after
+        def after(ms, func=None, *args):
+            if func is None:
+                return original_after(ms)
+            due = time.perf_counter_ns() + ms * 1_000_000
+            name = getattr(func, "__name__", "after")
+            def callback(*callback_args):
+                self.record_queue_delay(name, time.perf_counter_ns() - due)
+                return func(*callback_args)
+            return original_after(ms, callback, *args)
+        widget.after = after
+
+    # Export
+    def summary(self, budget_ms=FRAME_BUDGET_MS): # everything recorded so far, with a within-budget verdict per handler
+        result = {"budget_ms": budget_ms, "seconds": (time.perf_counter_ns() - self.started_ns) / 1e9, "handlers": {}}
+        for name in sorted(set(self.handlers) | set(self.queued)):
+            entry = {"run": self.handlers[name].summary() if name in self.handlers else None,
+                     "queued": self.queued[name].summary() if name in self.queued else None}
+            worst = sum(part["p99_ms"] for part in (entry["run"], entry["queued"]) if part) # time from the event to the handler finishing
+            entry["p99_total_ms"] = worst
+            entry["within_budget"] = worst <= budget_ms
+            result["handlers"][name] = entry
+        return result
+
+    def export(self, directory, budget_ms=FRAME_BUDGET_MS): # writes summary.json, handlers.pstats and trace.json into directory; returns their paths
+        os.makedirs(directory, exist_ok=True)
+        paths = {"summary": os.path.join(directory, "summary.json"), "trace": os.path.join(directory, "trace.json")}
+        with open(paths["summary"], 'w', encoding='utf-8') as f:
+            json.dump(self.summary(budget_ms), f, indent=2)
+        with open(paths["trace"], 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": [{"name": name, "ph": "X", "ts": (start - self.started_ns) / 1000, "dur": duration / 1000, "pid": 1, "tid": 1}
+                                       for name, start, duration in self.spans], "displayTimeUnit": "ms"}, f)
+        if self.profiler is not None:
+            paths["profile"] = os.path.join(directory, "handlers.pstats")
+            self.profiler.dump_stats(paths["profile"])
+        return paths
+
+
+class DebugOverlay: # live handler timings drawn over the corner of the main window (toggled with F12; F11 exports)
+    def __init__(self, root, instrumentation, export_dir="instrumentation", refresh_ms=500):
+        import tkinter as tk
+        self.root = root
+        self.instrumentation = instrumentation
+        self.export_dir = export_dir
+        self.refresh_ms = refresh_ms
+        self.label = tk.Label(root, font=('Courier', 10), justify='left', anchor='nw', bg='#1A1A2E', fg='#E7DCC7', padx=6, pady=4)
+        self.visible = False
+        self.job = None
+        root.bind_all("<F12>", lambda event: self.toggle())
+        root.bind_all("<F11>", lambda event: self.export())
+
+    def toggle(self):
+        self.visible = not self.visible
+        if self.visible:
+            self.label.place(relx=1.0, x=-10, y=10, anchor='ne')
+            self.refresh()
+        else:
+            self.label.place_forget()
+            if self.job is not None:
+                self.root.after_cancel(self.job)
+                self.job = None
+
+    def refresh(self): # redraws the table (only while the overlay is shown)
+        lines = [f"{'handler':<15}{'calls':>7}{'p50':>8}{'p99':>8}{'max':>8}{'queue99':>9}{'>16ms':>6}"]
+        summary = self.instrumentation.summary()
+        for name, entry in summary["handlers"].items():
+            run, queued = entry["run"] or {}, entry["queued"] or {}
+            lines.append(f"{name[:14]:<15}{run.get('count', 0):>7}{run.get('p50_ms', 0):>8.2f}{run.get('p99_ms', 0):>8.2f}"
+                         f"{run.get('max_ms', 0):>8.2f}{queued.get('p99_ms', 0):>9.2f}{run.get('over_budget', 0):>6}")
+        lines.append("times in ms - F11 exports, F12 hides")
+        self.label.config(text="\n".join(lines))
+        self.job = self.root.after(self.refresh_ms, self.refresh)
+
+    def export(self):
+        paths = self.instrumentation.export(self.export_dir)
+        print("instrumentation exported to " + ", ".join(paths.values()))
+
+
+def main(): # prints an exported summary and exits with an error if any handler's p99 is over the budget
+    parser = argparse.ArgumentParser(description="Checks an exported instrumentation summary against a frame budget.")
+    parser.add_argument("summary", help="summary.json written by Instrumentation.export")
+    parser.add_argument("--budget-ms", type=float, default=FRAME_BUDGET_MS)
+    args = parser.parse_args()
+
+    with open(args.summary, 'r', encoding='utf-8') as f:
+        handlers = json.load(f)["handlers"]
+    print(f"{'handler':<16} {'calls':>7} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} {'queue p99':>10} {'total p99':>10}")
+    failed = []
+    for name, entry in handlers.items():
+        run, queued = entry["run"] or {}, entry["queued"] or {}
+        total = sum(part.get("p99_ms", 0) for part in (run, queued))
+        print(f"{name:<16} {run.get('count', 0):>7} {run.get('p50_ms', 0):>9.2f} {run.get('p99_ms', 0):>9.2f} {run.get('max_ms', 0):>9.2f} {queued.get('p99_ms', 0):>10.2f} {total:>10.2f}")
+        if name in ("on_key_down", "on_key_press") and total > args.budget_ms: # keystroke handling is what has to fit in a frame
+            failed.append(name)
+    if failed:
+        print(f"over the {args.budget_ms} ms budget: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"keystroke handling is within the {args.budget_ms} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+import queue
+import random
+import threading
+import time
+from array import array
+from collections import deque
+
+# Per-Keystroke Key Clicks
+# pygame and type.wav are only loaded when the user starts typing, on a background thread, so that neither slows down
+# the first window. Until loading has finished (or if it fails) the test simply runs without sound.
+# type.wav is a recording of someone typing: loading cuts the loudest individual key clicks out of it, trims them to a
+# short fixed length and keeps each as a separate, already decoded Sound, optionally at a few slightly different pitches.
+# The Tk key handler only puts the key on a queue; a dispatcher thread plays it on the next of a reserved pool of mixer
+# channels (SDL mixes on its own audio thread), so sound never blocks scoring, and a burst of fast keys just takes the
+# next channels in turn. Clicks that could not be dispatched within MAX_DELAY_MS are skipped rather than played late.
+
+MIXER_BUFFER = 256 # samples per mixer buffer (smaller means lower latency; 256 at 44.1 kHz is under 6 ms)
+CLICK_MS = 70 # length of each click
+MAX_DELAY_MS = 40 # clicks still waiting after this long are dropped
+ONSET_BLOCK_MS = 5 # resolution of the click detection
+ONSET_THRESHOLD = 0.25 # fraction of the recording's peak level that counts as the start of a click
+
+
+def find_clicks(samples, channels, rate, count, click_ms=CLICK_MS): # start frames of the count loudest clicks in 16-bit interleaved samples, in order
+    block = max(1, rate * ONSET_BLOCK_MS // 1000) * channels # samples per detection block
+    envelope = [max(map(abs, samples[i:i + block])) for i in range(0, len(samples), block)]
+    if not envelope:
+        return []
+    threshold = max(envelope) * ONSET_THRESHOLD
+    spacing = click_ms // ONSET_BLOCK_MS # blocks a click lasts, so its tail is not taken for another click
+    onsets = []
+    for i, level in enumerate(envelope):
+        if level >= threshold and (i == 0 or envelope[i - 1] < threshold) and (not onsets or i - onsets[-1][1] >= spacing):
+            onsets.append((level, i))
+    loudest = sorted(onsets, reverse=True)[:count]
+    return sorted(max(0, i - 1) * block // channels for _, i in loudest) # starts one block early to keep the attack
+
+
+def cut_click(samples, channels, start_frame, frames): # copies one click and fades out its last fifth so it does not end with a pop
+    click = samples[start_frame * channels:(start_frame + frames) * channels]
+    fade = max(1, len(click) // channels // 5)
+    for frame in range(len(click) // channels - fade, len(click) // channels):
+        gain = (len(click) // channels - frame) / fade
+        for c in range(channels):
+            click[frame * channels + c] = int(click[frame * channels + c] * gain)
+    return click
+
+
+def pitch_shift(click, channels, factor): # resamples a click (factor > 1 raises its pitch and shortens it)
+    frames = int(len(click) // channels / factor)
+    shifted = array('h', bytes(2 * frames * channels))
+    for frame in range(frames):
+        source = int(frame * factor) * channels
+        for c in range(channels):
+            shifted[frame * channels + c] = click[source + c]
+    return shifted
+
+
+class KeyClicks: # lazily loaded per-keystroke click player
+    def __init__(self, path='type.wav', volume=0.3, channels=8, clicks=4, pitches=(0.95, 1.0, 1.05), vary='key'):
+        self.path = path # file that provides sound effects (key tapping sounds as user types)
+        self.volume = volume
+        self.pool_size = channels # mixer channels reserved for clicks
+        self.click_count = clicks # individual clicks cut from the recording
+        self.pitches = pitches # pitch factors each click is prepared at
+        self.vary = vary # 'key' gives each key its own click, 'random' picks one per press, None always plays the first
+        self.sounds = [] # prepared pygame Sounds once loaded
+        self.error = None # loading error, if any
+        self.latencies = deque(maxlen=10000) # nanoseconds from click() to the channel starting to play, for recent clicks
+        self.dropped = 0 # clicks skipped because they waited longer than MAX_DELAY_MS
+        self.ready = False
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+
+    def load(self): # starts loading in the background (only the first call does anything)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="key-clicks", daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        import pygame
+        pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=MIXER_BUFFER)
+        pygame.mixer.init() # initializes pygame mixer, which creates sound effects within typing test
+        rate, size, channels = pygame.mixer.get_init()
+        recording = pygame.mixer.Sound(self.path) # loads file that provides sound effects, converted to the mixer's format
+        if size == -16:
+            samples = array('h', recording.get_raw())
+            frames = rate * CLICK_MS // 1000
+            clicks = [cut_click(samples, channels, start, frames) for start in find_clicks(samples, channels, rate, self.click_count)]
+            sounds = [pygame.mixer.Sound(buffer=pitch_shift(click, channels, factor).tobytes()) for click in clicks for factor in self.pitches]
+        else: # a mixer format the trimming does not handle, so the whole recording is played per key
+            sounds = []
+        sounds = sounds or [recording]
+        for sound in sounds:
+            sound.set_volume(self.volume) # lowers volume of sounds
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), self.pool_size))
+        pygame.mixer.set_reserved(self.pool_size) # other sounds can never take the click channels
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.pool_size)]
+        self.sounds = sounds
+
+    def _run(self): # loads the clicks, then plays queued keys until close()
+        try:
+            self._load()
+        except Exception as e: # if sound doesn't work, the test carries on silently
+            self.error = e
+            print(f"Sound loading error: {e}")
+            return
+        self.ready = True
+        max_delay = MAX_DELAY_MS * 1_000_000
+        next_channel = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            key, queued_ns = item
+            if time.perf_counter_ns() - queued_ns > max_delay:
+                self.dropped += 1
+                continue
+            self.channels[next_channel].play(self.sound_for(key)) # round robin, so a burst never waits for a free channel
+            next_channel = (next_channel + 1) % len(self.channels)
+            self.latencies.append(time.perf_counter_ns() - queued_ns)
+
+    def sound_for(self, key): # the prepared click for a key
+        if self.vary == 'key':
+            return self.sounds[hash(key) % len(self.sounds)] # the same key sounds the same throughout a run
+        if self.vary == 'random':
+            return random.choice(self.sounds)
+        return self.sounds[0]
+
+    def click(self, key): # plays a click for a key press without waiting for it (starts loading if needed); False while there is no sound yet
+        if not self.ready:
+            self.load()
+            return False
+        self._queue.put((key, time.perf_counter_ns()))
+        return True
+
+    def wait(self, timeout=None): # blocks until loading has finished (used by benchmarks); True if clicks can be played
+        self.load()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.ready and self.error is None and self._thread.is_alive():
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(0.005)
+        return self.ready
+
+    def close(self): # stops the dispatcher thread
+        if self._thread is not None:
+            self._queue.put(None)
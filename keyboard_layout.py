@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+# QWERTY Keyboard Layout
+# Shared by the results heatmaps and the keystroke analytics.
+
+QWERTY_LAYOUT = [ # defines the QWERTY keyboard layout as rows of keys
+    ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0', '-', '='], # Row 0 (number row)
+    ['Q', 'W', 'E', 'R', 'T', 'Y', 'U', 'I', 'O', 'P', '[', ']', '\\'], # Row 1 (top letter row)
+    ['A', 'S', 'D', 'F', 'G', 'H', 'J', 'K', 'L', ';', '\''], # Row 2 (middle letter row)
+    ['Z', 'X', 'C', 'V', 'B', 'N', 'M', ',', '.', '/'], # Row 3 (bottom letter row)
+]
+KEY_POSITIONS = {char: (row_idx, col_idx) for row_idx, row in enumerate(QWERTY_LAYOUT) for col_idx, char in enumerate(row)} # maps each key to its row and column position
+ROW_NAMES = ['Numbers', 'Top Row', 'Middle Row', 'Bottom Row']
+COLUMN_LABELS = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0', '-', '=', '\\']
+FINGER_NAMES = ['Left Pinky', 'Left Ring', 'Left Middle', 'Left Index', 'Right Index', 'Right Middle', 'Right Ring', 'Right Pinky', 'Thumbs']
+COLUMN_FINGERS = [0, 1, 2, 3, 3, 4, 4, 5, 6, 7, 7, 7, 7] # touch-typing finger for each keyboard column
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import struct
+import sys
+from array import array
+
+# Keystroke Event Log
+# Records every key event of a test as parallel typed arrays (timestamp, key, position) rather than a list of dicts,
+# so that a keystroke costs 16 bytes however long the session runs. Arrays over-allocate as they grow, like lists do,
+# so appending stays cheap. The log can be written to and read back from a compact binary file.
+
+BACKSPACE_CODE = 8 # code point stored for a deleted character ("\b")
+FILE_MAGIC = b"PTTK" # identifies a keystroke log file
+FILE_VERSION = 1
+HEADER = struct.Struct("<4sHQ") # magic, version, number of events (little-endian)
+
+
+class KeystrokeLog: # high-resolution record of every keystroke in a session
+    def __init__(self):
+        self.times = array('q') # time of each event in nanoseconds (from time.perf_counter_ns unless replayed)
+        self.keys = array('I') # code point of the typed character, or BACKSPACE_CODE for a deletion
+        self.positions = array('I') # index in the passage where the character was typed or deleted
+
+    def __len__(self):
+        return len(self.times)
+
+    def clear(self):
+        del self.times[:]
+        del self.keys[:]
+        del self.positions[:]
+
+    def copy(self): # independent snapshot of the log (for analysing it on another thread while typing continues)
+        log = KeystrokeLog()
+        log.times.extend(self.times)
+        log.keys.extend(self.keys)
+        log.positions.extend(self.positions)
+        return log
+
+    def append(self, time_ns, key, position): # records one key event (key is a one-character string or "\b")
+        self.times.append(time_ns)
+        self.keys.append(ord(key))
+        self.positions.append(position)
+
+    def record_delta(self, time_ns, old_text, new_text, start, offset=0): # records the keys implied by a change of the typed text (positions are shifted by offset)
+        for position in range(len(old_text) - 1, start - 1, -1): # deleted characters (backspaces remove from the end first)
+            self.append(time_ns, "\b", offset + position)
+        for position in range(start, len(new_text)): # newly typed characters (a paste records several at the same time)
+            self.append(time_ns, new_text[position], offset + position)
+
+    @property
+    def nbytes(self): # memory used by the recorded events
+        return sum(column.itemsize * len(column) for column in (self.times, self.keys, self.positions))
+
+    # Timing Analysis
+    def intervals(self): # inter-key latencies in nanoseconds (one fewer than the number of events)
+        times = self.times
+        return array('q', (times[i] - times[i - 1] for i in range(1, len(times))))
+
+    def hesitations(self, threshold_ns=1_000_000_000): # indices of keys that came after a pause of at least threshold_ns
+        times = self.times
+        return [i for i in range(1, len(times)) if times[i] - times[i - 1] >= threshold_ns]
+
+    def burst_speed(self, window=10): # fastest rate over any window of consecutive keys, in words per minute (five keys to a word)
+        times = self.times
+        if len(times) <= window:
+            return 0
+        fastest = min(times[i] - times[i - window] for i in range(window, len(times)))
+        return (window / 5) / (fastest / 60e9) if fastest > 0 else 0
+
+    # Binary Export
+    def to_bytes(self): # the log as a header followed by each column's raw little-endian bytes
+        parts = [HEADER.pack(FILE_MAGIC, FILE_VERSION, len(self))]
+        for column in (self.times, self.keys, self.positions):
+            if sys.byteorder == 'big':
+                column = array(column.typecode, column)
+                column.byteswap()
+            parts.append(column.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, source="data"): # reads a log produced by to_bytes
+        log = cls()
+        magic, version, count = HEADER.unpack_from(data, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(f"{source} is not a version {FILE_VERSION} keystroke log")
+        offset = HEADER.size
+        for column in (log.times, log.keys, log.positions):
+            size = column.itemsize * count
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            offset += size
+        return log
+
+    def save(self, path): # writes the log to a binary file
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path): # reads a log written by save
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read(), path)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from collections import deque
+
+# Passage Prefetching
+# Serves the passages of a test one at a time from any iterable (a short list, or an endless stream for long-text mode),
+# preparing the next few on a background thread while the user is still typing the current one, so that moving on to the
+# next passage never waits on reading the store, looking up metadata or picking practice passages.
+
+
+class PassageFeed: # passages of one test, prepared ahead of time
+    def __init__(self, passages, executor, lookahead=2):
+        self.passages = iter(passages)
+        self.executor = executor # a single-worker executor, so the iterator is only ever advanced by one thread at a time
+        self.pending = deque(executor.submit(self._fetch) for _ in range(lookahead))
+
+    def _fetch(self):
+        return next(self.passages, None)
+
+    def next(self): # the next passage (None once there are no more); starts preparing the one after the lookahead
+        future = self.pending.popleft()
+        self.pending.append(self.executor.submit(self._fetch))
+        return future.result() # normally finished long ago, so this does not block
+
+    def close(self): # drops passages that were prepared but will not be used
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
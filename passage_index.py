@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from keystroke_log import BACKSPACE_CODE
+from passage_store import PassageStore
+
+# Weakness Index
+# An inverted index, built alongside the passage store, from every character and bigram to the passages that contain it.
+# Each posting list is sorted densest first (occurrences per character of passage) and keeps only the POSTINGS_PER_TERM
+# densest passages, so picking a practice passage for a user's error profile reads a few short posting prefixes and never
+# touches the rest of the corpus, however many passages it has. Passage numbers match the store's, per difficulty.
+#
+# Layout (little-endian):
+#   header      magic "PTIX", version (u16), number of difficulties (u16)
+#   directory   per difficulty: name (16 bytes, utf-8, zero padded), passage count (u64), term count (u64), term table offset (u64)
+#   term tables per difficulty: the sorted term codes, then each term's postings offset, then its postings count (u64 columns)
+#   postings    per term: (passage number (u32), density (f32)) pairs, densest first
+
+INDEX_MAGIC = b"PTIX"
+INDEX_VERSION = 1
+HEADER = struct.Struct("<4sHH")
+DIRECTORY_ENTRY = struct.Struct("<16sQQQ")
+POSTING = struct.Struct("<If")
+POSTINGS_PER_TERM = 1024 # densest passages kept for each character or bigram
+SEARCH_DEPTH = 64 # postings read per term when selecting a passage
+MAX_TERMS = 12 # most heavily weighted characters and bigrams used when selecting a passage
+
+
+def term_code(term): # one integer per character or bigram (code points fit in 21 bits, so bigrams never collide with characters)
+    if len(term) == 1:
+        return ord(term)
+    return (ord(term[0]) << 21) | ord(term[1])
+
+
+def passage_terms(text): # occurrences of each character and bigram in a passage
+    counts = Counter(text)
+    counts.update(a + b for a, b in zip(text, text[1:]))
+    return counts
+
+
+def error_profile(character_mistype, keystrokes=None, target=""): # {character or bigram: weight} from a user's mistakes, each kind summing to 1
+    chars = {char: count for char, count in character_mistype.items() if count > 0}
+    bigrams = Counter()
+    if keystrokes is not None: # a mistyped character also counts against the pair it ends, since slips often depend on the previous key
+        for key, position in zip(keystrokes.keys, keystrokes.positions):
+            if key != BACKSPACE_CODE and 0 < position < len(target) and chr(key) != target[position]:
+                bigrams[target[position - 1:position + 1]] += 1
+    weights = {}
+    for counts in (chars, bigrams):
+        total = sum(counts.values())
+        for term, count in counts.items():
+            weights[term] = count / total
+    return weights
+
+
+class PassageIndex: # memory-mapped weakness index
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_directory()
+        except (ValueError, struct.error) as e:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} passage index ({e})") from None
+        self.tables = {} # term tables, read the first time a difficulty is searched
+
+    def _read_directory(self): # reads the header and directory, checking that the term tables are inside the file (a truncated index raises ValueError)
+        if len(self.data) < HEADER.size:
+            raise ValueError("too short for a header")
+        magic, version, difficulties = HEADER.unpack_from(self.data, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("wrong magic or version")
+        if HEADER.size + difficulties * DIRECTORY_ENTRY.size > len(self.data):
+            raise ValueError("truncated directory")
+        self.directory = {}
+        for i in range(difficulties):
+            name, passages, terms, table_offset = DIRECTORY_ENTRY.unpack_from(self.data, HEADER.size + i * DIRECTORY_ENTRY.size)
+            if table_offset + 3 * 8 * terms > len(self.data):
+                raise ValueError("truncated term table")
+            self.directory[name.rstrip(b"\0").decode('utf-8')] = (passages, terms, table_offset)
+
+    def close(self):
+        self.data.close()
+
+    def passage_count(self, difficulty):
+        return self.directory[difficulty][0] if difficulty in self.directory else 0
+
+    def matches(self, store): # whether the index was built from this store (same difficulties and passage counts)
+        return all(self.passage_count(d) == len(passages) for d, passages in store.items())
+
+    def _table(self, difficulty): # (codes, postings offsets, postings counts) of one difficulty
+        if difficulty not in self.tables:
+            _, terms, offset = self.directory[difficulty]
+            columns = []
+            for _ in range(3):
+                column = array('Q')
+                column.frombytes(self.data[offset:offset + 8 * terms])
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                columns.append(column)
+                offset += 8 * terms
+            self.tables[difficulty] = columns
+        return self.tables[difficulty]
+
+    def postings(self, difficulty, term, limit=SEARCH_DEPTH): # up to limit (passage number, density) pairs for a term, densest first
+        if difficulty not in self.directory:
+            return []
+        codes, offsets, counts = self._table(difficulty)
+        code = term_code(term)
+        i = bisect_left(codes, code)
+        if i == len(codes) or codes[i] != code:
+            return []
+        start = offsets[i]
+        return POSTING.iter_unpack(self.data[start:start + POSTING.size * min(counts[i], limit)])
+
+    def select(self, difficulty, weights, count=1, exclude=(), depth=SEARCH_DEPTH): # passage numbers that best exercise the weighted characters and bigrams, best first
+        terms = heapq.nlargest(MAX_TERMS, weights.items(), key=itemgetter(1))
+        scores = defaultdict(float)
+        for term, weight in terms:
+            for passage, density in self.postings(difficulty, term, depth):
+                scores[passage] += weight * density
+        ranked = heapq.nlargest(count + len(exclude), scores.items(), key=itemgetter(1))
+        return [passage for passage, _ in ranked if passage not in exclude][:count]
+
+
+def write_index(path, store, postings_per_term=POSTINGS_PER_TERM): # builds the index for every passage in a PassageStore
+    tables = []
+    for difficulty, passages in store.items():
+        heaps = defaultdict(list) # term -> min-heap of its (density, passage) postings, so only the densest are held in memory
+        for i in range(len(passages)):
+            text = passages[i]
+            if not text:
+                continue
+            for term, occurrences in passage_terms(text).items():
+                heap = heaps[term]
+                if len(heap) < postings_per_term:
+                    heapq.heappush(heap, (occurrences / len(text), i))
+                else:
+                    heapq.heappushpop(heap, (occurrences / len(text), i))
+        codes = sorted((term_code(term), term) for term in heaps)
+        tables.append((difficulty, len(passages), [(code, sorted(heaps[term], reverse=True)) for code, term in codes]))
+
+    offset = HEADER.size + DIRECTORY_ENTRY.size * len(tables)
+    directory = []
+    for difficulty, passages, terms in tables:
+        directory.append(DIRECTORY_ENTRY.pack(difficulty.encode('utf-8'), passages, len(terms), offset))
+        offset += 24 * len(terms)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(tables)))
+        out.write(b"".join(directory))
+        for _, _, terms in tables: # term tables, pointing at the postings that follow them
+            codes, starts, counts = array('Q'), array('Q'), array('Q')
+            for code, postings in terms:
+                codes.append(code)
+                starts.append(offset)
+                counts.append(len(postings))
+                offset += POSTING.size * len(postings)
+            for column in (codes, starts, counts):
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                column.tofile(out)
+        for _, _, terms in tables:
+            for _, postings in terms:
+                out.write(b"".join(POSTING.pack(passage, density) for density, passage in postings))
+    os.replace(tmp_path, path) # readers never see a half-written index
+
+
+def load_index(path, store): # opens the index for a store, or None if there is no index or it was built from different passages
+    if not isinstance(store, PassageStore):
+        return None
+    try:
+        index = PassageIndex(path)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not index.matches(store):
+        index.close()
+        return None
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds the weakness index for a passage store.")
+    parser.add_argument("store", nargs="?", default="typing_passages.bin")
+    parser.add_argument("index", nargs="?", default=None, help="index file to write (default: the store name with a .idx extension)")
+    args = parser.parse_args()
+
+    store = PassageStore(args.store)
+    write_index(args.index or os.path.splitext(args.store)[0] + '.idx', store)
+    store.close()
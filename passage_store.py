@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+# Indexed Passage Store
+# A single file holding every passage as packed UTF-8 text plus, for each difficulty, an index of where each passage starts
+# and ends. The game memory-maps the file and slices out the one passage it needs, so nothing else is read or parsed and
+# startup does not depend on how many passages there are. JSON remains the import/export format.
+# Passages are normalized and their metadata (the word count the results are scored with) is computed once, when the
+# store is written, so the game only has to look it up.
+#
+# Layout (little-endian):
+#   header      magic "PTPS", version (u16), number of difficulties (u16), blob offset (u64)
+#   directory   per difficulty: name (16 bytes, utf-8, zero padded), passage count (u64), index offset (u64)
+#   indexes     per difficulty: count entries of (text start, text end, metadata start, metadata end) byte offsets into the blob (u64 each)
+#   blob        every passage's normalized UTF-8 text followed by its metadata as compact JSON, back to back
+
+STORE_MAGIC = b"PTPS"
+STORE_VERSION = 2
+HEADER = struct.Struct("<4sHHQ")
+DIRECTORY_ENTRY = struct.Struct("<16sQQ")
+INDEX_ENTRY = struct.Struct("<QQQQ")
+TYPEABLE_REPLACEMENTS = str.maketrans({'‘': '\'', '’': '\'', '–': '-'}) # ensures that users are able to type certain non-alphanumeric characters accurately
+
+
+def normalize_passage(passage): # replaces curly quotes and dashes with characters found on a keyboard
+    return passage.translate(TYPEABLE_REPLACEMENTS)
+
+
+def passage_metadata(text): # everything the game needs to know about a (normalized) passage, computed once at build time
+    return {
+        "words": len(text.split()), # number of words typed for the passage
+    }
+
+
+class PassageList: # read-only sequence over one difficulty's passages; random.choice works on it directly
+    def __init__(self, store, count, index_offset):
+        self.store = store
+        self.count = count
+        self.index_offset = index_offset
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("passage index out of range")
+        return self._slice(i, 0).decode('utf-8')
+
+    def _slice(self, i, field): # raw bytes of passage i's text (field 0) or metadata (field 1)
+        offsets = INDEX_ENTRY.unpack_from(self.store.data, self.index_offset + INDEX_ENTRY.size * i)
+        blob = self.store.blob_offset
+        return self.store.data[blob + offsets[2 * field]:blob + offsets[2 * field + 1]]
+
+    def metadata(self, i): # precomputed metadata of passage i
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("passage index out of range")
+        return json.loads(self._slice(i, 1))
+
+    def entry(self, i): # (normalized text, metadata) of passage i
+        return self[i], self.metadata(i)
+
+    def __bool__(self):
+        return self.count > 0
+
+
+class PassageStore: # memory-mapped passage file
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_directory()
+        except (ValueError, struct.error) as e:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {STORE_VERSION} passage store ({e})") from None
+
+    def _read_directory(self): # reads the header and directory, checking that everything they point to is inside the file (a truncated store raises ValueError)
+        if len(self.data) < HEADER.size:
+            raise ValueError("too short for a header")
+        magic, version, difficulties, self.blob_offset = HEADER.unpack_from(self.data, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise ValueError("wrong magic or version")
+        if HEADER.size + difficulties * DIRECTORY_ENTRY.size > self.blob_offset or self.blob_offset > len(self.data):
+            raise ValueError("truncated directory")
+        self.lists = {}
+        blob_end = 0
+        for i in range(difficulties):
+            name, count, index_offset = DIRECTORY_ENTRY.unpack_from(self.data, HEADER.size + i * DIRECTORY_ENTRY.size)
+            if index_offset + count * INDEX_ENTRY.size > self.blob_offset:
+                raise ValueError("truncated index")
+            if count: # passages are written to the blob in order, so each list's last entry shows how far the blob must reach
+                blob_end = max(blob_end, INDEX_ENTRY.unpack_from(self.data, index_offset + (count - 1) * INDEX_ENTRY.size)[3])
+            self.lists[name.rstrip(b"\0").decode('utf-8')] = PassageList(self, count, index_offset)
+        if self.blob_offset + blob_end > len(self.data):
+            raise ValueError("truncated passage text")
+
+    def get(self, difficulty, default=None): # mirrors dict.get so the store can stand in for the parsed JSON
+        return self.lists.get(difficulty, default)
+
+    def __getitem__(self, difficulty):
+        return self.lists[difficulty]
+
+    def __contains__(self, difficulty):
+        return difficulty in self.lists
+
+    def keys(self):
+        return self.lists.keys()
+
+    def items(self):
+        return self.lists.items()
+
+    def close(self):
+        self.data.close()
+
+    def to_json(self, out_file, include_metadata=False): # exports the store in the same layout as typing_passages.json (optionally with a parallel "metadata" section)
+        data = {"passages": {d: list(passages[:]) for d, passages in self.items()}}
+        if include_metadata:
+            data["metadata"] = {d: [passages.metadata(i) for i in range(len(passages))] for d, passages in self.items()}
+        with open(out_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+def write_store(path, passages, difficulties=('easy', 'medium', 'hard')): # writes (difficulty, passage) pairs from any iterable, streaming the text to disk
+    indexes = {d: array('Q') for d in difficulties} # offsets are the only thing held in memory (32 bytes per passage)
+    blob_length = 0
+    with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as blob:
+        for difficulty, passage in passages:
+            text = normalize_passage(passage)
+            encoded = text.encode('utf-8')
+            metadata = json.dumps(passage_metadata(text), separators=(',', ':')).encode('utf-8')
+            blob.write(encoded)
+            blob.write(metadata)
+            text_end = blob_length + len(encoded)
+            indexes[difficulty].extend((blob_length, text_end, text_end, text_end + len(metadata)))
+            blob_length = text_end + len(metadata)
+
+        index_offset = HEADER.size + DIRECTORY_ENTRY.size * len(difficulties)
+        directory = []
+        for difficulty in difficulties:
+            directory.append(DIRECTORY_ENTRY.pack(difficulty.encode('utf-8'), len(indexes[difficulty]) // 4, index_offset))
+            index_offset += indexes[difficulty].itemsize * len(indexes[difficulty])
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            out.write(HEADER.pack(STORE_MAGIC, STORE_VERSION, len(difficulties), index_offset))
+            out.write(b"".join(directory))
+            for difficulty in difficulties:
+                index = indexes[difficulty]
+                if sys.byteorder == 'big':
+                    index.byteswap()
+                index.tofile(out)
+            blob.seek(0)
+            shutil.copyfileobj(blob, out)
+        os.replace(tmp_path, path) # readers never see a half-written store
+
+
+def json_passage_pairs(json_path): # reads (difficulty, passage) pairs from a typing_passages.json file
+    with open(json_path, 'r', encoding='utf-8') as f:
+        passages = json.load(f).get("passages", {})
+    for difficulty, items in passages.items():
+        for passage in items:
+            yield difficulty, passage
+
+
+def passage_entry(passages, i): # (normalized text, metadata) of passage i, from the store or, for plain lists of strings, computed on the spot
+    if isinstance(passages, PassageList):
+        return passages.entry(i)
+    text = normalize_passage(passages[i])
+    return text, passage_metadata(text)
+
+
+def load_passages(store_path="typing_passages.bin", json_path="typing_passages.json"): # opens the store, falling back to parsing the JSON file if there is no store
+    try:
+        return PassageStore(store_path)
+    except (FileNotFoundError, ValueError): # no store, or one that is corrupt or truncated
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("passages", {})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts between typing_passages.json and the indexed passage store.")
+    parser.add_argument("source", help="a .json file to import, or a store file to export")
+    parser.add_argument("destination")
+    parser.add_argument("--metadata", action="store_true", help="include each passage's metadata when exporting to JSON")
+    args = parser.parse_args()
+
+    if args.source.endswith(".json"):
+        write_store(args.destination, json_passage_pairs(args.source))
+        from passage_index import write_index # the weakness index is rebuilt with the store, since it refers to passages by number
+        store = PassageStore(args.destination)
+        write_index(os.path.splitext(args.destination)[0] + '.idx', store)
+        store.close()
+    else:
+        store = PassageStore(args.source)
+        store.to_json(args.destination, args.metadata)
+        store.close()
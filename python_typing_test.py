@@ -1,40 +1,39 @@
 # -*- coding: utf-8 -*-
 
-import numpy as np
+import argparse
 import tkinter as tk
 from tkinter import ttk
-import pygame
+import itertools
 import json
 import random
 import time
-from collections import defaultdict, Counter
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, deque
+from key_audio import KeyClicks
+from passage_feed import PassageFeed
+from passage_index import error_profile, load_index
+from passage_store import load_passages, passage_entry
+from results_dashboard import ChartPreparer, HistoryWindow, ResultsDashboard
+from session_history import SessionHistory, default_user
+from tag_renderer import TagRenderer
+from typing_engine import ScoreDelta
+from typing_session import TypingSession
 
 # Sets Up Test (Initialization) (D = Tenzin; O = Ariella)
-pygame.mixer.init() # initializes pygame mixer, which creates sound effects within typing test
-try:
-  key_sound = pygame.mixer.Sound('type.wav') # loads file that provides sound effects (key tapping sounds as user types)
-except Exception as e: # if sound doesn't work
-  print(f"Sound loading error: {e}")
-  key_sound = None
-key_sound.set_volume(0.3) # lowers volume of sounds 
-
-# Global Variables (D = Tenzin; O = Ariella); used mainly for constants
-start_time = None # tracks elapsed time (starts at 0)
-char_position = 0 # tracks position of character within string of text (starts at 0)
-errors = 0 # tracks number of mistakes made by user (starts at 0)
-wpm_tracker = [] # tracks words per minute (wpm) values as they change throughout a given test
+# matplotlib is imported in the background once the user starts typing and pygame when the user first presses a key, so that neither delays the first window
+key_clicks = KeyClicks('type.wav', volume=0.3) # a key click for every key the user presses, loaded in the background on the first keypress (stays silent if loading fails)
+
+# Global Variables (D = Tenzin; O = Ariella); used mainly for constants (timing, errors and wpm for the current test live in its TypingSession)
 character_mistype = defaultdict(int) # tracks number of times user incorrectly types a particular character
-word_counter = Counter() # tracks number of times a particular word emerges during the test
-total_char = 0 # tracks total number of characters encountered during a test (starts at 0)
+MIN_RECORDED_SECONDS = 5 # typing time a test needs before it is saved to the history
+recent_picks = deque(maxlen=30) # (difficulty, passage number) of recently served passages, so that practice tests do not repeat them
 
 # Loads Passages (D = Tenzin; O = Ariella)
-try: # attempts to load local JSON passages from typing_passages.json
-    with open("typing_passages.json", "r", encoding="utf-8") as f:
-        LOCAL_PASSAGES = json.load(f).get("passages", [])
+try: # memory-maps the indexed passage store (typing_passages.bin), falling back to parsing typing_passages.json if there is no store
+    LOCAL_PASSAGES = load_passages("typing_passages.bin", "typing_passages.json")
 except (FileNotFoundError, json.JSONDecodeError):
     LOCAL_PASSAGES = {"easy": [], "medium": [], "hard": []}
+LOCAL_INDEX = load_index("typing_passages.idx", LOCAL_PASSAGES) # weakness index over the store, for practice passages that target the user's mistakes (None without a matching index)
 
 FALLBACK_PASSAGES = [ # built-in fallback passages if JSON is missing or broken
     "We hope you're enjoying our typing test!",
@@ -43,16 +42,39 @@ FALLBACK_PASSAGES = [ # built-in fallback passages if JSON is missing or broken
     "This is a fallback passage, used when your local text file can't be found."
 ]
 
-def retrieve_quotation(num_paragraphs=3, difficulty="medium"): # obtains passage of text with three paragraphs for a medium difficulty level test
-    global word_counter
-
-    suitable_passages = LOCAL_PASSAGES.get(difficulty, []) # retrieves a selection of passages that fit the criteria in the function above
+def suitable_passages_for(difficulty): # retrieves a selection of passages that fit the criteria in the function above
+    suitable_passages = LOCAL_PASSAGES.get(difficulty, [])
     if not suitable_passages: # if there is no passage found with the necessary criteria, as defined above, the test offers the user a default option
         suitable_passages = FALLBACK_PASSAGES
-
-    selected_passage = random.choice(suitable_passages).replace('‘', '\'').replace('’', '\'').replace('–', '-') # randomly picks passage from selection of passages with the necessary criteria ("suitable_passages") and ensures that users are able to type certain non-alphanumeric characters accurately
-    word_counter = Counter(selected_passage.split(" ")) # counts number of words in the passage for post-test word frequency analysis
-    return [selected_passage] 
+    return suitable_passages
+
+def pick_passages(suitable_passages, num_paragraphs, difficulty, weights=None): # numbers of the passages to use, targeting the user's weak keys when weights are given
+    picks = []
+    if weights and LOCAL_INDEX is not None and suitable_passages is not FALLBACK_PASSAGES: # picks the passages that most exercise the characters the user keeps mistyping
+        picks = LOCAL_INDEX.select(difficulty, weights, num_paragraphs, exclude={i for d, i in recent_picks if d == difficulty})
+    needed = min(num_paragraphs, len(suitable_passages)) - len(picks)
+    while needed > 0: # randomly picks (the remaining) passages from selection of passages with the necessary criteria ("suitable_passages"), sampling the range of passage numbers rather than listing them, so the cost does not grow with the store
+        extra = [i for i in random.sample(range(len(suitable_passages)), needed) if i not in picks] # redraws the few that were already picked
+        picks += extra
+        needed -= len(extra)
+    recent_picks.extend((difficulty, i) for i in picks)
+    return picks
+
+def retrieve_quotation(num_paragraphs=3, difficulty="medium", weights=None): # obtains (text, number of words) of three paragraphs for a medium difficulty level test
+    suitable_passages = suitable_passages_for(difficulty)
+    picks = pick_passages(suitable_passages, num_paragraphs, difficulty, weights)
+    selected_passages = [] 
+    for i in picks:
+        text, metadata = passage_entry(suitable_passages, i) # normalized text and its precomputed statistics (the store already ensures that users are able to type certain non-alphanumeric characters accurately)
+        selected_passages.append((text, metadata["words"])) # the word count is looked up rather than counted, for the results' wpm
+    return selected_passages 
+
+def stream_quotation(difficulty="medium", weights=None): # yields (text, number of words) of passages one after another for long-text mode: consecutive passages of the book, so the text reads on, starting from a random (or practice) pick
+    suitable_passages = suitable_passages_for(difficulty)
+    start = pick_passages(suitable_passages, 1, difficulty, weights)[0]
+    for n in itertools.count(): # wraps around to the start of the book, so the test runs until the user ends it
+        text, metadata = passage_entry(suitable_passages, (start + n) % len(suitable_passages))
+        yield text, metadata["words"]
 
 # Constructs GUI (D = Ariella, O = Tenzin)
 class PythonTypingTestApp: # defines class of GUI
@@ -60,15 +82,27 @@ class PythonTypingTestApp: # defines class of GUI
     self.root = root # sets up and saves main window of typing test
     self.root.title("Python Typing Test") # creates title of typing test
     self.root.geometry('1020x720') # specifies size of window
-    self.sound_started = False # initializes sound effect variable
 
     # multi-stage tracking variables (used within GUI class, along with global variables; also used mainly for evolving values)
-    self.paragraphs = [] # holds text to be typed by user
+    self.paragraphs = [] # holds text to be typed by user, as (text, number of words) pairs
     self.current_index = 0 # tracks which paragraph user is typing (starts at 0, or first paragraph, and therefore, the first test)
     self.total_errors = 0 # tracks number of mistakes made by user (starts at 0)
     self.total_chars = 0 # tracks total number of characters encountered during a test (starts at 0)
     self.total_words = 0 # tracks total number of words encountered during a test (starts at 0)
+    self.paragraph_start_words = 0 # words the session had counted when the current paragraph began
     self.full_start_time = None # tracks elapsed time (starts at 0)
+    self.stats_job = None # id of the scheduled update_stats call, kept so that the 1-second timer can be cancelled
+    self.chart_preparer = ChartPreparer() # imports matplotlib and prepares chart data in the background
+    self.dashboard = None # results window, built the first time results are shown
+    self.history = SessionHistory() # saves every finished test and keeps running totals for each user
+    self.user = default_user() # name the history is saved under
+    self.history_window = None # history window, built the first time it is opened
+    self.prefetcher = ThreadPoolExecutor(max_workers=1) # prepares upcoming paragraphs in the background
+    self.feed = None # paragraphs of the current test, prepared ahead of time
+    self.test_words = 0 # number of words in the paragraph being typed
+    self.upcoming = None # paragraph shown after the current one, as (text, number of words) (None for the last paragraph of a test)
+    self.skip_space = False # whether a space typed first on the new paragraph is ignored (one space between paragraphs is not a mistake)
+    self.session = TypingSession(mistype_counter=character_mistype) # headless scoring state for the current test (timing, errors, wpm), updating character_mistype as errors are made
 
     self.setup_widgets() # places the elements of our GUI within the test (detailed in next section of the code)
     self.reset_test() # clears all previous data before (re)starting test
@@ -97,7 +131,7 @@ class PythonTypingTestApp: # defines class of GUI
         "   ● Easy: Paragraphs with just the English alphabet and periods.\n"
         "   ● Medium: Moderate-length passages with basic punctuation.\n"
         "   ● Hard: Paragraphs with other special characters included.\n\n"
-        "2. After changing a difficulty level, please press Restart Test. \n\n"
+        "2. After changing a difficulty level (or ticking Long text, to keep typing paragraph after paragraph until you press End Test), please press Restart Test. \n\n"
         "3. Start typing the paragraph shown in the white box. Your time has now started\n\n"
         "4. Characters will be highlighted as:\n"
         "   ● Green: Correct\n"
@@ -138,6 +172,10 @@ class PythonTypingTestApp: # defines class of GUI
     self.difficulty = tk.StringVar(value = "medium") # stores difficulty level, with medium difficulty level as default
     ttk.Label(self.root, text="Select Difficulty:", font=('Baskerville', 18), background ='#E7DCC7', foreground ='#1A1A2E').pack(pady=(20, 5)) # labels difficulty level selection window ("Difficulty:")
     ttk.Combobox(self.root, textvariable = self.difficulty, values = ["easy","medium","hard"]).pack() # allows user to select difficulty (either "easy," "medium," or "hard") through a dropdown option.
+    self.practice_weak_keys = tk.BooleanVar(value = False) # whether restarting picks passages that target the user's most mistyped characters
+    tk.Checkbutton(self.root, text="Practice my weak keys", variable = self.practice_weak_keys, font=('Baskerville', 14), bg='#E7DCC7', fg='#1A1A2E', activebackground='#E7DCC7').pack(pady=(5, 0))
+    self.long_text = tk.BooleanVar(value = False) # whether restarting starts a long-text test that keeps going (through the book) until the user presses End Test
+    tk.Checkbutton(self.root, text="Long text (type until you press End Test)", variable = self.long_text, font=('Baskerville', 14), bg='#E7DCC7', fg='#1A1A2E', activebackground='#E7DCC7').pack(pady=(5, 0))
 
     self.display_text = tk.Text(self.root, height=7, font=('Baskerville',18), wrap='word', bg='#FFFFFF', fg='#1A1A2E', relief='solid', bd=1)
     self.display_text.pack(fill='x', padx=20, pady=10)
@@ -148,10 +186,13 @@ class PythonTypingTestApp: # defines class of GUI
     self.display_text.tag_config("correct", foreground="green") # if typed letter is correct
     self.display_text.tag_config("incorrect", foreground="red") # if typed letter is incorrect
     self.display_text.tag_config("cursor", background="yellow", foreground="black")
+    self.display_text.tag_config("upcoming", foreground="#8A8A9A") # the next paragraph, shown below the current one
+    self.renderer = TagRenderer(self.display_text) # redraws highlights in coalesced runs rather than one character at a time
 
     # hidden input field: This block of code captures keystrokes without the user seeing it do so   
     self.hidden_input = tk.Entry(self.root) # creates hidden text input box
     self.hidden_input.place(x=-1000, y=-1000) # moves the input box off-screen (so that the user can't see it)
+    self.hidden_input.bind("<KeyPress>", self.on_key_down) # plays a click as soon as a key goes down
     self.hidden_input.bind("<KeyRelease>", self.on_key_press) # collects data every time user releases a key
     self.hidden_input.focus_set() # requires keyboard input to be focused on widget
     
@@ -170,273 +211,203 @@ class PythonTypingTestApp: # defines class of GUI
     # styles the "restart test" button
     self.restart_btn = ttk.Button(self.root, text = "Restart Test", command = self.reset_test, style="Red.TButton") # user can restart typing test by pressing "Restart Test" button
     self.restart_btn.pack(pady=(5, 20))
+
+    # styles the "view history" button
+    self.history_btn = ttk.Button(self.root, text = "View History", command = self.show_history, style="Red.TButton") # user can see their results across all previous tests
+    self.history_btn.pack(pady=(5, 20))
   
   # Resets Typing Test (D = Ariella, O = Tenzin)
   def reset_test (self): # clears prior attempt and creates fresh test for user after restarting
-    global start_time, char_position, errors, total_char # makes sure these variables can be accessed within this function, even though they are created outside the function
-    self.paragraphs = retrieve_quotation(num_paragraphs=3, difficulty=self.difficulty.get()) # calls function that retrieves quotation, which gives users a new quotation to type
+    if self.feed is not None:
+      self.feed.close() # drops the previous test's prefetched paragraphs
+    if self.long_text.get(): # paragraphs keep coming until the user ends the test
+      self.paragraphs = None
+      self.feed = PassageFeed(stream_quotation(difficulty=self.difficulty.get(), weights=self.weak_key_weights()), self.prefetcher)
+    else:
+      self.paragraphs = retrieve_quotation(num_paragraphs=3, difficulty=self.difficulty.get(), weights=self.weak_key_weights()) # calls function that retrieves quotation, which gives users a new quotation to type
+      self.feed = PassageFeed(self.paragraphs, self.prefetcher)
     self.current_index = 0 # resets the paragraph user is typing to 0, or first paragraph (first test)
     self.total_errors = 0 # resets number of mistakes made by user to 0
     self.total_chars = 0 # resets total number of characters encountered during a test to 0
     self.total_words = 0 # resets total number of words encountered during a test to 0
+    self.paragraph_start_words = 0
     self.full_start_time = None # resets elapsed time to 0
-    self.load_paragraph() # retrieves a new paragraph for the user
-    
-    self.display_text.config(state = 'normal') # temporarily allows display to be edited (in this case, by updating it to create a new test)
-    self.display_text.delete('1.0','end') # clears text from previous test
-    self.display_text.insert('1.0',self.test) # places new text into text display window
-    self.display_text.config(state = 'disabled') # switches display back to read-only format
+    self.skip_space = False
+    self.load_paragraph() # retrieves a new paragraph for the user and places it into the text display window
     
     self.hidden_input.delete(0, 'end') # clears previous typed content in hidden text input box
     self.hidden_input.focus_set() # requires keyboard input to be focused on widget
     
-    start_time = None # resets elapsed time to 0
-    char_position = 0 # resets position of character within string of text to 0
-    errors = 0 # resets number of mistakes made by user to 0
-    total_char = len(self.test) # tracks total number of characters encountered during new test
+    character_mistype.clear() # mistyped characters are counted per test, not across restarts
+    self.session.reset(self.test) # resets elapsed time, errors, keystroke log and tracked words per minute values for the new passage
     self.progress['value'] = 0 # resets progress bar to 0%
-    wpm_tracker.clear() # clears tracked words per minute values
 
+    self.stop_stats() # cancels the previous test's timer so that ticks do not pile up across restarts
     self.update_stats() # begins tracking wpm
 
+  def weak_key_weights(self): # the user's error profile for picking practice passages (None unless practice is switched on)
+    if not self.practice_weak_keys.get():
+      return None
+    if any(character_mistype.values()): # mistakes from the test just taken, including the character pairs they happened in
+      return error_profile(character_mistype, self.session.keystrokes, self.session.full_text)
+    summary = self.history.summary(self.user) # otherwise the user's most mistyped characters across all previous tests
+    return error_profile(dict(summary["char_errors"])) if summary else None
+
   def update_stats(self): # tracks and updates wpm as user types
-    global start_time, wpm_tracker
-    if not start_time: # if user hasn't started typing
-        start_time = time.time() # start time is the current time when the user hasn't started typing
-
-    current_time = time.time()
-    elapsed_minutes = (current_time - start_time) / 60  # calculates elapsed time in minutes
-    typed = self.hidden_input.get().split()  # gets the typed words from hidden input field
-    if elapsed_minutes > 0: # once user has started the test
-        wpm = len(typed) / elapsed_minutes  # calculates wpm
-        wpm_tracker.append(wpm)  # stores wpm in a list
+    self.session.sample_wpm() # adds the rolling wpm to the tracker (nothing is stored until the user has started typing)
+    if self.session.progress >= 75: # prepares the results charts in the background while the user finishes typing
+      self.chart_preparer.submit(character_mistype, self.session.keystrokes, self.session.full_text)
     
-    self.root.after(1000, self.update_stats) # schedules this method to run again after each second (updates the wpm as it changes over the course of a test)
+    self.stats_job = self.root.after(1000, self.update_stats) # schedules this method to run again after each second (updates the wpm as it changes over the course of a test)
+
+  def stop_stats(self): # cancels the scheduled update_stats call, if there is one
+    if self.stats_job is not None:
+      self.root.after_cancel(self.stats_job)
+      self.stats_job = None
 
   # (D = Tenzin; O = Ariella)
   def load_paragraph(self): # gives the user a new paragraph to type
-    global char_position, errors, total_char, start_time
-
     if self.current_index == 0: # if user is on the first paragraph (first test)
       self.full_start_time = time.time() # time tracked during the test
-
-    self.test = self.paragraphs[self.current_index] # loads one paragraph for user given the number of paragraphs user has typed (0 at the beginning of the test)
-    self.display_text.config(state='normal') # temporarily allows text display to be edited
-    self.display_text.delete('1.0', 'end') # clears text display
-    self.display_text.insert('1.0', self.test) # provides user with new text display
+      self.test, self.test_words = self.feed.next() # loads the first paragraph for user
+      self.upcoming = self.feed.next()
+      self.renderer.set_text(self.test, self.upcoming and self.upcoming[0]) # provides user with new text display (and a preview of the next paragraph)
+    else:
+      self.test, self.test_words = self.upcoming # the previewed paragraph, prepared in the background while the user typed the last one
+      self.upcoming = self.feed.next()
+      self.renderer.advance(self.upcoming and self.upcoming[0]) # scrolls the display on, keeping only a window of the text in the widget
+
+  def next_paragraph(self, overflow=""): # moves on to the next paragraph once the current one is fully typed
+    self.total_errors += self.session.errors # adds the finished paragraph's mistakes, characters and words to the test's totals
+    self.total_chars += len(self.test)
+    self.total_words += self.test_words
+    self.current_index += 1
+    self.load_paragraph()
+    self.session.advance(self.test) # keeps timing and wpm running across paragraphs
+    self.paragraph_start_words = self.session.words
+
+    if overflow.startswith(" "): # a space typed between paragraphs is not a mistake, whether it comes before or after the move
+      overflow = overflow[1:]
+      self.skip_space = False
+    else:
+      self.skip_space = not overflow # nothing typed on the new paragraph yet, so a space pressed next is skipped in on_key_press
+    self.hidden_input.delete(0, 'end') # the hidden input only ever holds the current paragraph
+    self.hidden_input.insert(0, overflow) # keeps keys typed past the end of the last paragraph (fast typists press the next key before releasing the last one)
+    delta = self.session.feed(overflow) if overflow else ScoreDelta(0, 0, []) # nothing to score yet, but the cursor still moves to the new paragraph
+    self.renderer.render(delta, cursor_index=len(overflow) if len(overflow) < len(self.test) else None)
+
+  def test_progress(self): # percentage of the test typed (of the current paragraph in long-text mode, which has no end)
+    if self.paragraphs is None:
+      return self.session.progress
+    total = sum(len(paragraph) for paragraph, words in self.paragraphs)
+    return (self.session.offset + self.session.position) / total * 100 if total else 0
 
   # Indicates What Happens When a User Presses a Key (D = Tenzin; O = Ariella)
-  def on_key_press(self, event): # methods controls what happens when a user presses a key
-    global start_time, char_position, errors, total_char
+  def on_key_down(self, event): # plays a click for each key that types or deletes a character (the first keypress starts loading the clicks; they play once loaded)
+    if self.session.end_time is None and (event.char or event.keysym == "BackSpace"):
+      key_clicks.click(event.keysym) # only queues the click, so the sound never delays scoring
 
-    # starts the sound only when the user types the first character
-    if not self.sound_started:
-      if key_sound:
-        key_sound.play(loops=-1)  # starts sound when typing begins
-        self.sound_started = True  # sets the flag to indicate that sound has started
-    
-    if not start_time: # if user hasn't started typing
-      start_time = time.time() # start time is the current time when the user hasn't started typing
-      self.full_start_time = start_time # time tracked during the test
-      
+  def on_key_press(self, event): # methods controls what happens when a user presses a key
+    if self.session.end_time is not None: # the test is over until it is restarted
+      return
+    self.chart_preparer.warm_up() # starts importing matplotlib in the background once typing begins
     typed_text = self.hidden_input.get() # user's typed text (collected in hidden input field)
-    target_text = self.test # what the user should type for full accuracy
-
-    self.display_text.config(state='normal') # temporarily allows text display to be edited (see below for specific edits)
-    self.display_text.tag_remove("correct", "1.0", "end") # clears previous green highlights (if letter is typed correctly)
-    self.display_text.tag_remove("incorrect", "1.0", "end") # clears previous red highlights (if letter is typed incorrectly)
-    self.display_text.config(state='disabled') # switches display back to read-only format
-
-    min_len = min(len(typed_text), len(target_text)) # takes shortest length of typed text that matches target text (typed characters will not be compared to target characters past this point)
-    errors = 0 # resets number of mistakes made by user to 0
+    if self.skip_space and typed_text: # the first key typed on a new paragraph
+      self.skip_space = False
+      if typed_text.startswith(" "):
+        self.hidden_input.delete(0)
+        typed_text = typed_text[1:]
+    delta = self.session.feed(typed_text[:len(self.test)]) # scores only the characters that changed since the last key event (the session's timer starts with the first one); keys typed past the end of the paragraph are left for the next one, so they are scored and logged once
+    if self.current_index == 0: # time tracked during the test starts when the user starts typing the first paragraph
+      self.full_start_time = self.session.start_time
 
   # Indicates What Happens During the Test (D = Ariella; O = Tenzin) 
-    i = min_len - 1 # index of the last character that is typed (because Python indexing starts at 0)
-    expected = target_text[i]
-    typed = typed_text[i]
-    if typed != expected: # if the typed text does not align with the expected (accurate) text
-      errors += 1 # count discrepancy as an error
-      character_mistype[expected] += 1 # captures error
-    for i in range(min_len): # for all characters in the shortest line of typed text
-      expected = target_text[i] 
-      typed = typed_text[i]
-      tag = "correct" if typed == expected else "incorrect" # typed text considered correct if it matches the target text
-      self.display_text.tag_add(tag, f"1.{i}", f"1.{i+1}") # highlights characters as green (correct) or red (incorrect) based on accuracy
-    
-    self.progress['value'] = (min_len / total_char) * 100 # updates progress bar depending on the amount of text user has typed relative to the entire text
-    for i in range(len(target_text), len(typed_text)): # for all typed characters beyond the target text
-      self.display_text.tag_add("incorrect", f"1.{i}", f"1.{i+1}") # marked as incorrect
-      errors += 1 # count discrepancy as an error
-
-    self.display_text.config(state='normal') # temporarily allows text display to be edited
-    self.display_text.tag_remove("cursor", "1.0", "end") # clears cursor from display
-      
-    if len(typed_text) < len(target_text): # if user has not typed the entirety of the target text
-      next_index = len(typed_text) # next letter that the user should type
-      self.display_text.tag_add("cursor", f"1.{next_index}", f"1.{next_index + 1}") # cursor is added to indicate which letter the user should type next
+    next_index = len(typed_text) if len(typed_text) < len(self.test) else None # next letter that the user should type (none once the entire target text is typed)
+    self.renderer.render(delta, cursor_index=next_index) # highlights changed characters as green (correct) or red (incorrect) and moves the cursor
 
-    self.display_text.config(state='disabled') # switches display back to read-only format
+    if self.session.finished: # the whole paragraph has been typed
+      if self.upcoming is None:
+        self.end_test() # the test ends automatically after its last paragraph
+        return
+      self.next_paragraph(typed_text[len(self.test):])
+
+    self.progress['value'] = self.test_progress() # updates progress bar depending on the amount of text user has typed relative to the entire text
 
   # Post-Test Calculations (D = Tenzin, O = Ariella)
   def end_test(self): # after the test ends
-    if self.sound_started:  # checks if sound is playing
-        key_sound.stop()  # stops the sound when the test ends
-        self.sound_started = False  # resets the flag
-    
-    typed_text = self.hidden_input.get() # user's typed text (collected in hidden input field)
-    target_text = self.test # what the user should type for full accuracy
-    
-    errors = 0 # resets number of mistakes made by user to 0
-    for i in range(len(typed_text)): # for all characters in the typed text
-      expected = target_text[i]
-      typed = typed_text[i]
-      if typed != expected: # if the typed text does not align with the expected (accurate) text
-        errors += 1 # count discrepancy as an error
+    if self.session.end_time is not None: # already ended (the last paragraph was finished, or End Test was pressed twice)
+      return
+    self.session.feed(self.hidden_input.get()[:len(self.test)]) # scores anything typed since the last key release (keys past the end of the test do not count)
+    self.session.finish() # stops the session clock
+    errors = self.session.errors # number of characters typed incorrectly, kept up to date by the scoring engine
     
     self.total_errors += errors # adds mistakes made by user during test to total number of mistakes made by user across all tests
     self.total_chars += len(self.test) # adds total number of characters encountered during a test to number encountered across all tests
-    self.total_words += len(self.test.split()) # adds total number of words encountered during a test to number encountered across all tests
+    if self.session.finished: # adds total number of words encountered during a test to number encountered across all tests
+      self.total_words += self.test_words
+    else: # a paragraph cut short by End Test only counts the words typed in it
+      self.total_words += self.session.words - self.paragraph_start_words
 
     self.display_text.config(state='disabled') # switches display back to read-only format
     self.progress['value'] = 100 # progress bar is shown to be 100% filled once the user has completed the test
     
-    self.root.after_cancel(self.update_stats)
+    self.stop_stats() # stops tracking wpm
 
     self.show_results() # shows results windows when test ends
   
   # Closes All Windows (D = Ariella; O = Tenzin)
   def destroy_everything(self):
-    self.root.after_cancel(self.update_stats)
+    self.stop_stats()
+    self.feed.close()
+    self.prefetcher.shutdown(wait=False)
+    key_clicks.close()
+    self.history.close()
     self.root.destroy()
 
   # WPM and Accuracy Statistics (D = Ariella, Tenzin; O = Ariella, Tenzin)
   def show_results(self): # displays typing statistics once test is completed
-    global wpm_tracker 
+    wpm_tracker = self.session.wpm_tracker # wpm values tracked throughout the test
     
     time_taken = time.time() - self.full_start_time if self.full_start_time else 1 # calculates the amount of time user has spent on the test (fallback option is 1 second so that the calculation does not cause an error if there are no data on start time)
     wpm = (self.total_words / time_taken) * 60  # calculates wpm for the test
     accuracy = ((self.total_chars - self.total_errors) / self.total_chars) * 100 if self.total_chars else 0 # calculates accuracy for the test as a percentage (falls back to 0 if there are no data on accuracy)
 
-    highest_speed = max(wpm_tracker) if wpm_tracker else 0  # calculates the highest wpm achieved during the test
-    average_speed = sum(wpm_tracker) / len(wpm_tracker) if wpm_tracker else 0  # calculates the average wpm achieved during the test
-    wpm_tracker.append(wpm)
-
-    # displays all results in a unified window
-    dashboard = tk.Toplevel(self.root) # creates a new top-level window (subwindow) for displaying results
-    dashboard.title("Typing Test Results Dashboard") # sets the title of the results window
-    dashboard.geometry("1250x900")  # sets the size of the results window
-    dashboard.configure(bg="#1A1A2E") # sets background color to match the main window
-
-    # header for the dashboard
-    header = tk.Label(dashboard, text="Typing Test Results", font=('Baskerville', 20, 'bold'), pady=10, foreground="#E7DCC7", bg = "#1A1A2E")
-    header.pack() # places the header at the top of the results window
-
-    # frame for post-test statistics
-    stats_frame = tk.Frame(dashboard, padx=10, pady=10, bg="#E7DCC7")  # creates a frame for statistics with padding and background color
-    stats_frame.pack()
-
-    tk.Label(stats_frame, text=f"Final WPM: {wpm:.2f}", font=('Baskerville', 14), bg="#E7DCC7", fg="#1A1A2E").grid(row=0, column=0, padx=5, pady=2) # WPM label
-    tk.Label(stats_frame, text=f"Accuracy: {accuracy:.2f}%", font=('Baskerville', 14), bg="#E7DCC7", fg="#1A1A2E").grid(row=1, column=0, padx=5, pady=2) # accuracy label
-    tk.Label(stats_frame, text=f"Highest Speed: {highest_speed:.2f} WPM", font=('Baskerville', 14), bg="#E7DCC7", fg="#1A1A2E").grid(row=2, column=0, padx=5, pady=2) # highest speed label
-    tk.Label(stats_frame, text=f"Average Speed: {average_speed:.2f} WPM", font=('Baskerville', 14), bg="#E7DCC7", fg="#1A1A2E").grid(row=3, column=0, padx=5, pady=2) # average speed label
-
-    # subheading for charts
-    chart_description = tk.Label(dashboard, text="Performance Analysis", font=('Baskerville', 20, 'bold'), pady=5, fg="#E7DCC7", bg="#1A1A2E")
-    chart_description.pack(pady=(30, 0)) # adds space between the stats and the chart description
-    chart_info = tk.Label(dashboard, text="The following charts display your typing accuracy and error distribution. Please feel free to use these insights to improve your typing skills.", font=('Baskerville', 14), wraplength=800, fg="#E7DCC7", bg="#1A1A2E")
-    chart_info.pack(pady=(10, 20))
-
-    # frame for charts
-    charts_frame = tk.Frame(dashboard, padx=10, pady=10) # creates a frame for the charts
-    charts_frame.pack()
-
-    # embeds error rate chart
-    error_chart_canvas = FigureCanvasTkAgg(self.plot_error_rate_chart(), master=charts_frame)  # attaches error chart to the frame
-    error_chart_canvas.draw() # renders the chart on the canvas
-    error_chart_canvas.get_tk_widget().grid(row=0, column=0, padx=5, pady=5) # positions chart in the first column
-
-    # embeds heatmap chart
-    heatmap_canvas = FigureCanvasTkAgg(self.plot_heatmap(), master=charts_frame) # attaches heatmap to the frame
-    heatmap_canvas.draw() # renders the heatmap on the canvas
-    heatmap_canvas.get_tk_widget().grid(row=0, column=1, padx=5, pady=5)  # positions chart in the second column
-
-    # closes button
-    close_btn = ttk.Button(dashboard, text="Close", command=self.destroy_everything, style="Red.TButton") # creates a close button styled with the theme
-    close_btn.pack(pady=(10, 20)) # places the button at the bottom of the results window with padding
-    
-    # shows the dashboard
-    dashboard.grab_set()  # makes the dashboard the active window
-    dashboard.focus_set() # sets focus to the dashboard to capture user input
-    dashboard.transient(self.root) # keeps the dashboard on top of the main application window
-    dashboard.protocol("WM_DELETE_WINDOW", dashboard.destroy) # sets the close operation to properly destroy the window
-
-  # (D = Ariella, Tenzin; O = Ariella, Tenzin)
-  def plot_error_rate_chart(self): # plots a bar chart to show the frequency of typing errors
-    fig, ax = plt.subplots(figsize=(6, 4)) # creates a figure and a single subplot with specified size
-    
-    # extracts the characters that were mistyped and their respective counts
-    keys = list(character_mistype.keys()) # list of characters that were mistyped
-    values = [character_mistype[k] for k in keys] # list of error counts corresponding to each mistyped character
-    
-    # handles the case where no errors were recorded
-    if not keys:  
-      ax.text(0.5, 0.5, "No Errors", ha='center', va='center', fontsize=14, color="#3B4C66") # displays message in the center of the chart
-      ax.set_title("No Typing Errors Recorded", fontweight='bold', fontsize=14) # title for the empty error chart
-    else: 
-      ax.bar(keys, values, color='#8B0000') # red-colored bars representing error frequency
-      ax.set_title("Typing Error Frequency", fontweight='bold', fontsize=14, color="#1A1A2E") # chart title
-      ax.set_ylabel("Mistakes", fontsize=8, color="#1A1A2E") # label for the y-axis, indicating mistake count
-      ax.set_xlabel("Characters", fontsize=8, color="#1A1A2E") # label for the x-axis, showing the characters
-
-    fig.patch.set_facecolor("#E7DCC7") # sets the background color to match the dashboard theme
-    plt.tight_layout()  # adjusts layout to prevent overlap of labels and chart elements
-    return fig # returns the completed figure object for embedding in the GUI
+    highest_speed = wpm_tracker.highest  # the highest wpm achieved during the test, kept up to date as samples arrive
+    average_speed = wpm_tracker.average  # the average wpm achieved during the test, kept as a running total
 
-  # (D = Tenzin; O = Ariella)
-  def plot_heatmap(self):
-    # defines the QWERTY keyboard layout as rows of keys
-    qwerty_layout = [
-      ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0', '-', '='],  # Row 0 (number row)
-      ['Q', 'W', 'E', 'R', 'T', 'Y', 'U', 'I', 'O', 'P', '[', ']', '\\'],  # Row 1 (top letter row)
-      ['A', 'S', 'D', 'F', 'G', 'H', 'J', 'K', 'L', ';', '\''],  # Row 2 (middle letter row)
-      ['Z', 'X', 'C', 'V', 'B', 'N', 'M', ',', '.', '/']  # Row 3 (bottom letter row)
-    ]
-
-    # creates a 4x13 matrix (max row length) initialized to zero
-    heat_data = [[0] * 13 for _ in range(4)]
-
-    # creates dictionary mapping each key to its row and column position
-    key_positions = {char: (row_idx, col_idx) for row_idx, row in enumerate(qwerty_layout) for col_idx, char in enumerate(row)}
-
-    # maps errors to the correct row and column based on the keyboard layout
-    for char, count in character_mistype.items():
-      pos = key_positions.get(char.upper()) # gets the position of the character from the dictionary
-      if pos: # checks if the character position exists
-        row_idx, col_idx = pos # unpacks the row and column indices
-        heat_data[row_idx][col_idx] = count # updates the heatmap data with the count of errors
-
-    # creates the heatmap
-    fig, ax = plt.subplots(figsize=(6, 3))  # sets the figure size for the heatmap
-    cax = ax.imshow(heat_data, cmap='Reds', interpolation='nearest', aspect='auto') # generates the heatmap
-    ax.set_title("Typing Error Heatmap (QWERTY Layout)", fontweight='bold', fontsize=14, color="#1A1A2E") # sets the chart title
-
-    # sets dynamic labels for the heatmap
-    ax.set_xticks(range(13)) # sets x-axis ticks for each column
-    ax.set_xticklabels(['1', '2', '3', '4', '5', '6', '7', '8', '9', '0', '-', '=', '\\']) # labels for x-axis
-    ax.set_yticks(range(4)) # sets y-axis ticks for each row
-    ax.set_yticklabels(['Numbers', 'Top Row', 'Middle Row', 'Bottom Row']) # labels for y-axis
-    fig.colorbar(cax) # adds a color bar to indicate intensity
-
-    # style tweaks for consistent visual appearance
-    fig.patch.set_facecolor("#E7DCC7") # sets background color for the figure
-    ax.set_facecolor("#E7DCC7") # sets background color for the axes
-    plt.tight_layout() # adjusts layout to fit everything properly
-    return fig
+    if len(self.session.keystrokes) and self.session.elapsed() >= MIN_RECORDED_SECONDS: # a test ended before any real typing is shown but not saved, since the running totals could never drop it again
+      self.history.record(self.user, wpm, accuracy, self.total_errors, self.total_chars, time_taken, self.session.full_text, character_mistype, self.session.keystrokes, self.difficulty.get()) # saves the test and updates the running totals
+
+    chart_data = self.chart_preparer.result(character_mistype, self.session.keystrokes, self.session.full_text) # chart data, usually already prepared in the background while the user was typing
+    if self.dashboard is None: # the results window and its charts are built once and reused for every later test
+      self.dashboard = ResultsDashboard(self.root, on_close=self.destroy_everything)
+    self.dashboard.show(wpm, accuracy, highest_speed, average_speed, chart_data) # updates the statistics and chart data and shows the dashboard
+
+  def show_history(self): # shows the user's results across all previous tests
+    if self.history_window is None: # built once and reused
+      self.history_window = HistoryWindow(self.root)
+    self.history_window.show(self.history.summary(self.user)) # reads only the running totals, however many tests the user has taken
 
 # Runs the GUI (D = Tenzin, O = Ariella)
 if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Python Typing Test")
+  parser.add_argument("--instrument", nargs="?", const="instrumentation", default=None, metavar="DIR", help="time the key, timer and test handlers, show them with F12 and export them to DIR (default: instrumentation) with F11 and on exit")
+  args = parser.parse_args()
+
+  instrumentation = None
+  if args.instrument: # opt-in, so that a normal run has no timing wrappers at all
+    from instrumentation import DebugOverlay, Instrumentation
+    instrumentation = Instrumentation()
+    instrumentation.instrument_class(PythonTypingTestApp) # before the window is built, so its bindings use the timed handlers
+
   root = tk.Tk()
+  if instrumentation is not None:
+    instrumentation.instrument_after(root) # also measures how late each scheduled update_stats call runs
   app = PythonTypingTestApp(root)
+  if instrumentation is not None:
+    overlay = DebugOverlay(root, instrumentation, args.instrument)
   root.mainloop()
+  if instrumentation is not None:
+    print("instrumentation exported to " + ", ".join(instrumentation.export(args.instrument).values()))
   del root
 
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+import importlib
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+from keyboard_layout import COLUMN_LABELS, KEY_POSITIONS, ROW_NAMES
+
+# Reusable Results Dashboard
+# The results window, its labels, both matplotlib figures and their artists are built the first time results are shown and
+# only have their data updated afterwards (bar heights, imshow array), so showing results again neither slows down nor
+# leaks figures. matplotlib and NumPy are imported, and the chart data is prepared, on a background thread while the user is typing.
+
+MAX_BARS = 30 # the error chart keeps this many bars and shows the most mistyped characters in them
+
+
+def prepare_chart_data(character_mistype, keystrokes=None, target=""): # turns the mistyped-character counts and keystroke log into what the charts draw
+    counts = sorted(character_mistype.items(), key=lambda item: -item[1])[:MAX_BARS] # most mistyped characters first
+    heat_data = [[0] * 13 for _ in range(4)] # creates a 4x13 matrix (max row length) initialized to zero
+    for char, count in character_mistype.items(): # maps errors to the correct row and column based on the keyboard layout
+        pos = KEY_POSITIONS.get(char.upper())
+        if pos:
+            row_idx, col_idx = pos
+            heat_data[row_idx][col_idx] += count
+    latency = [[0] * 13 for _ in range(4)] # mean time taken to reach each key, in milliseconds
+    if keystrokes is not None and len(keystrokes):
+        from typing_analytics import KeystrokeAnalysis
+        latency = KeystrokeAnalysis.from_log(keystrokes, target).heatmaps()[1].tolist()
+    return {"keys": [k for k, _ in counts], "values": [v for _, v in counts], "heat": heat_data, "latency": latency}
+
+
+class ChartPreparer: # imports matplotlib and prepares chart data on a background thread
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dashboard")
+        self.warmed = False
+        self.pending = None # (snapshot of the counts, future of its chart data)
+        self.lock = threading.Lock()
+
+    def warm_up(self): # imports matplotlib and NumPy in the background (only the first call does anything)
+        if not self.warmed:
+            self.warmed = True
+            self.executor.submit(_import_chart_modules)
+
+    def submit(self, character_mistype, keystrokes, target): # starts preparing chart data for a snapshot of the counts and keystroke log
+        key = (dict(character_mistype), len(keystrokes), target) # the counts only change when keys are pressed, so this identifies the snapshot
+        with self.lock:
+            if self.pending is None or self.pending[0] != key:
+                self.pending = (key, self.executor.submit(prepare_chart_data, key[0], keystrokes.copy(), target))
+
+    def result(self, character_mistype, keystrokes, target): # chart data for the current state (reuses the background result if nothing has changed since)
+        with self.lock:
+            pending = self.pending
+        if pending is not None and pending[0] == (character_mistype, len(keystrokes), target):
+            return pending[1].result()
+        return prepare_chart_data(character_mistype, keystrokes, target)
+
+
+def _import_chart_modules(): # loads the modules ResultsDashboard needs (it uses Figure directly rather than pyplot, which keeps a global reference to every figure it makes)
+    for name in ("matplotlib.figure", "matplotlib.backends.backend_tkagg", "typing_analytics"):
+        importlib.import_module(name)
+
+
+class ResultsDashboard: # results window that is built once and reused for every test
+    def __init__(self, root, on_close):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.window = tk.Toplevel(root) # creates a new top-level window (subwindow) for displaying results
+        self.window.title("Typing Test Results Dashboard") # sets the title of the results window
+        self.window.geometry("1250x900") # sets the size of the results window
+        self.window.configure(bg="#1A1A2E") # sets background color to match the main window
+        self.window.transient(root) # keeps the dashboard on top of the main application window
+        self.window.protocol("WM_DELETE_WINDOW", self.hide) # closing the window only hides it, so it can be shown again for the next test
+
+        # header for the dashboard
+        tk.Label(self.window, text="Typing Test Results", font=('Baskerville', 20, 'bold'), pady=10, foreground="#E7DCC7", bg="#1A1A2E").pack()
+
+        # frame for post-test statistics
+        stats_frame = tk.Frame(self.window, padx=10, pady=10, bg="#E7DCC7")
+        stats_frame.pack()
+        self.stat_vars = [tk.StringVar(self.window) for _ in range(4)] # Final WPM, Accuracy, Highest Speed and Average Speed labels
+        for row, var in enumerate(self.stat_vars):
+            tk.Label(stats_frame, textvariable=var, font=('Baskerville', 14), bg="#E7DCC7", fg="#1A1A2E").grid(row=row, column=0, padx=5, pady=2)
+
+        # subheading for charts
+        tk.Label(self.window, text="Performance Analysis", font=('Baskerville', 20, 'bold'), pady=5, fg="#E7DCC7", bg="#1A1A2E").pack(pady=(30, 0))
+        tk.Label(self.window, text="The following charts display your typing accuracy and error distribution. Please feel free to use these insights to improve your typing skills.", font=('Baskerville', 14), wraplength=800, fg="#E7DCC7", bg="#1A1A2E").pack(pady=(10, 20))
+
+        # frame for charts
+        charts_frame = tk.Frame(self.window, padx=10, pady=10)
+        charts_frame.pack()
+
+        # error rate chart: a fixed set of bars whose heights and labels are updated for each test
+        self.error_figure = Figure(figsize=(6, 4))
+        self.error_ax = self.error_figure.add_subplot()
+        self.bars = self.error_ax.bar(range(MAX_BARS), [0] * MAX_BARS, color='#8B0000') # red-colored bars representing error frequency
+        self.error_ax.set_xticks(range(MAX_BARS))
+        self.error_ax.set_ylabel("Mistakes", fontsize=8, color="#1A1A2E") # label for the y-axis, indicating mistake count
+        self.error_ax.set_xlabel("Characters", fontsize=8, color="#1A1A2E") # label for the x-axis, showing the characters
+        self.no_errors_text = self.error_ax.text(0.5, 0.5, "No Errors", ha='center', va='center', fontsize=14, color="#3B4C66", transform=self.error_ax.transAxes)
+        self.error_figure.patch.set_facecolor("#E7DCC7") # sets the background color to match the dashboard theme
+        self.error_canvas = FigureCanvasTkAgg(self.error_figure, master=charts_frame)
+        self.error_canvas.get_tk_widget().grid(row=0, column=0, padx=5, pady=5) # positions chart in the first column
+
+        # heatmaps: errors and mean latency per key, each one imshow whose array is replaced for each test
+        self.heat_figure = Figure(figsize=(6, 5))
+        self.heat_images = []
+        for ax, title, cmap in zip(self.heat_figure.subplots(2, 1), ("Typing Error Heatmap (QWERTY Layout)", "Mean Key Latency (ms)"), ('Reds', 'Blues')):
+            image = ax.imshow([[0] * 13 for _ in range(4)], cmap=cmap, interpolation='nearest', aspect='auto', vmin=0, vmax=1)
+            ax.set_title(title, fontweight='bold', fontsize=12, color="#1A1A2E")
+            ax.set_xticks(range(13)) # sets x-axis ticks for each column
+            ax.set_xticklabels(COLUMN_LABELS) # labels for x-axis
+            ax.set_yticks(range(4)) # sets y-axis ticks for each row
+            ax.set_yticklabels(ROW_NAMES) # labels for y-axis
+            ax.set_facecolor("#E7DCC7")
+            self.heat_figure.colorbar(image, ax=ax) # adds a color bar to indicate intensity
+            self.heat_images.append(image)
+        self.heat_figure.patch.set_facecolor("#E7DCC7")
+        self.heat_figure.tight_layout()
+        self.heat_canvas = FigureCanvasTkAgg(self.heat_figure, master=charts_frame)
+        self.heat_canvas.get_tk_widget().grid(row=0, column=1, padx=5, pady=5) # positions chart in the second column
+
+        # closes button
+        ttk.Button(self.window, text="Close", command=on_close, style="Red.TButton").pack(pady=(10, 20))
+
+    def show(self, wpm, accuracy, highest_speed, average_speed, chart_data): # fills in one test's results and shows the window
+        for var, text in zip(self.stat_vars, (f"Final WPM: {wpm:.2f}", f"Accuracy: {accuracy:.2f}%", f"Highest Speed: {highest_speed:.2f} WPM", f"Average Speed: {average_speed:.2f} WPM")):
+            var.set(text)
+
+        keys, values = chart_data["keys"], chart_data["values"]
+        for i, bar in enumerate(self.bars): # unused bars are given no height and no label
+            bar.set_height(values[i] if i < len(values) else 0)
+        self.error_ax.set_xticklabels(keys + [''] * (MAX_BARS - len(keys)))
+        self.error_ax.set_xlim(-0.5, max(len(keys), 1) - 0.5)
+        self.error_ax.set_ylim(0, max(values, default=0) * 1.1 or 1)
+        self.no_errors_text.set_visible(not keys) # handles the case where no errors were recorded
+        if keys:
+            self.error_ax.set_title("Typing Error Frequency", fontweight='bold', fontsize=14, color="#1A1A2E")
+        else:
+            self.error_ax.set_title("No Typing Errors Recorded", fontweight='bold', fontsize=14)
+        self.error_figure.tight_layout()
+        self.error_canvas.draw_idle()
+
+        for image, grid in zip(self.heat_images, (chart_data["heat"], chart_data["latency"])):
+            image.set_data(grid)
+            image.set_clim(0, max(max(row) for row in grid) or 1)
+        self.heat_canvas.draw_idle()
+
+        self.window.deiconify()
+        self.window.grab_set() # makes the dashboard the active window
+        self.window.focus_set() # sets focus to the dashboard to capture user input
+
+    def hide(self):
+        self.window.grab_release()
+        self.window.withdraw()
+
+
+class HistoryWindow: # session history view that is built once and reused, like the results dashboard
+    def __init__(self, root):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Typing Test History")
+        self.window.geometry("800x640")
+        self.window.configure(bg="#1A1A2E")
+        self.window.transient(root)
+        self.window.protocol("WM_DELETE_WINDOW", self.window.withdraw) # closing the window only hides it
+
+        tk.Label(self.window, text="Your Typing History", font=('Baskerville', 20, 'bold'), pady=10, foreground="#E7DCC7", bg="#1A1A2E").pack()
+        self.summary_var = tk.StringVar(self.window)
+        tk.Label(self.window, textvariable=self.summary_var, font=('Baskerville', 14), justify="left", bg="#E7DCC7", fg="#1A1A2E", padx=10, pady=10).pack(pady=(0, 10))
+
+        # wpm trend: one pair of lines whose data is replaced each time the window is shown
+        self.figure = Figure(figsize=(7, 3.5))
+        self.ax = self.figure.add_subplot()
+        self.average_line, = self.ax.plot([], [], color='#1A1A2E', marker='o', label="Average WPM")
+        self.best_line, = self.ax.plot([], [], color='#8B0000', linestyle='--', label="Best WPM")
+        self.ax.set_title("WPM Trend (by day)", fontweight='bold', fontsize=14, color="#1A1A2E")
+        self.ax.set_ylabel("WPM", fontsize=8, color="#1A1A2E")
+        self.ax.legend(loc='lower right', fontsize=8)
+        self.figure.patch.set_facecolor("#E7DCC7")
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.window)
+        self.canvas.get_tk_widget().pack(padx=10, pady=10)
+
+    def show(self, summary): # fills in a user's history summary (from SessionHistory.summary) and shows the window
+        if summary is None:
+            self.summary_var.set("No finished tests yet.")
+            trend = []
+        else:
+            worst = ", ".join(f"'{char}' ({count})" for char, count in summary["char_errors"]) or "none"
+            self.summary_var.set(
+                f"Tests completed: {summary['sessions']}\n"
+                f"Average WPM: {summary['average_wpm']:.2f}   Best WPM: {summary['best_wpm']:.2f}   Last WPM: {summary['last_wpm']:.2f}\n"
+                f"Average Accuracy: {summary['average_accuracy']:.2f}%\n"
+                f"Most mistyped characters: {worst}")
+            trend = summary["trend"]
+        days = list(range(len(trend)))
+        self.average_line.set_data(days, [average for _, average, _ in trend])
+        self.best_line.set_data(days, [best for _, _, best in trend])
+        self.ax.set_xticks(days[::max(1, len(days) // 6)])
+        self.ax.set_xticklabels([trend[i][0] for i in days[::max(1, len(days) // 6)]], fontsize=7)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+        self.window.deiconify()
+        self.window.lift()
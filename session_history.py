@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import getpass
+import sqlite3
+import time
+
+from keystroke_log import KeystrokeLog
+
+# Session History
+# Saves every finished test (its summary and keystroke log) in a local SQLite database. Each insert also updates running
+# per-user aggregates: totals and bests, per-character error totals and a per-day wpm trend. The history view therefore
+# reads a handful of small rows however many sessions a user has, and never rescans the raw history.
+
+HISTORY_PATH = "typing_history.sqlite3"
+TREND_DAYS = 90 # number of most recent days shown in the wpm trend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    difficulty TEXT,
+    duration REAL NOT NULL,
+    wpm REAL NOT NULL,
+    accuracy REAL NOT NULL,
+    errors INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    passage TEXT NOT NULL,
+    keystrokes BLOB
+);
+CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (user, finished_at);
+CREATE TABLE IF NOT EXISTS user_totals (
+    user TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    total_wpm REAL NOT NULL,
+    best_wpm REAL NOT NULL,
+    total_accuracy REAL NOT NULL,
+    total_chars INTEGER NOT NULL,
+    total_errors INTEGER NOT NULL,
+    last_wpm REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_char_errors (
+    user TEXT NOT NULL,
+    char TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user, char)
+);
+CREATE TABLE IF NOT EXISTS user_daily (
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    total_wpm REAL NOT NULL,
+    best_wpm REAL NOT NULL,
+    PRIMARY KEY (user, day)
+);
+"""
+
+
+def default_user(): # name the history is saved under (the login name, or "player" if there is none)
+    try:
+        return getpass.getuser()
+    except Exception:
+        return "player"
+
+
+class SessionHistory: # persistent store of finished typing tests
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def record(self, user, wpm, accuracy, errors, chars, duration, passage, character_mistype, keystrokes=None, difficulty=None, finished_at=None): # saves one session and updates the user's aggregates in the same transaction
+        finished_at = time.time() if finished_at is None else finished_at
+        day = time.strftime("%Y-%m-%d", time.localtime(finished_at))
+        blob = keystrokes.to_bytes() if keystrokes is not None else None
+        with self.db: # commits everything together, or nothing if any statement fails
+            cursor = self.db.execute(
+                "INSERT INTO sessions (user, finished_at, difficulty, duration, wpm, accuracy, errors, chars, passage, keystrokes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (user, finished_at, difficulty, duration, wpm, accuracy, errors, chars, passage, blob))
+            self.db.execute(
+                """INSERT INTO user_totals (user, sessions, total_wpm, best_wpm, total_accuracy, total_chars, total_errors, last_wpm) VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (user) DO UPDATE SET sessions = sessions + 1, total_wpm = total_wpm + excluded.total_wpm,
+                   best_wpm = MAX(best_wpm, excluded.best_wpm), total_accuracy = total_accuracy + excluded.total_accuracy,
+                   total_chars = total_chars + excluded.total_chars, total_errors = total_errors + excluded.total_errors, last_wpm = excluded.last_wpm""",
+                (user, wpm, wpm, accuracy, chars, errors, wpm))
+            self.db.executemany(
+                "INSERT INTO user_char_errors (user, char, count) VALUES (?, ?, ?) ON CONFLICT (user, char) DO UPDATE SET count = count + excluded.count",
+                [(user, char, count) for char, count in character_mistype.items() if count])
+            self.db.execute(
+                """INSERT INTO user_daily (user, day, sessions, total_wpm, best_wpm) VALUES (?, ?, 1, ?, ?)
+                   ON CONFLICT (user, day) DO UPDATE SET sessions = sessions + 1, total_wpm = total_wpm + excluded.total_wpm, best_wpm = MAX(best_wpm, excluded.best_wpm)""",
+                (user, day, wpm, wpm))
+        return cursor.lastrowid
+
+    def summary(self, user, trend_days=TREND_DAYS, top_chars=10): # the user's aggregates, read straight from the running totals (None if the user has no sessions)
+        row = self.db.execute("SELECT sessions, total_wpm, best_wpm, total_accuracy, total_chars, total_errors, last_wpm FROM user_totals WHERE user = ?", (user,)).fetchone()
+        if row is None:
+            return None
+        sessions, total_wpm, best_wpm, total_accuracy, total_chars, total_errors, last_wpm = row
+        trend = self.db.execute("SELECT day, total_wpm / sessions, best_wpm FROM user_daily WHERE user = ? ORDER BY day DESC LIMIT ?", (user, trend_days)).fetchall()
+        char_errors = self.db.execute("SELECT char, count FROM user_char_errors WHERE user = ? ORDER BY count DESC, char LIMIT ?", (user, top_chars)).fetchall()
+        return {
+            "sessions": sessions,
+            "average_wpm": total_wpm / sessions,
+            "best_wpm": best_wpm,
+            "last_wpm": last_wpm,
+            "average_accuracy": total_accuracy / sessions,
+            "total_chars": total_chars,
+            "total_errors": total_errors,
+            "trend": trend[::-1], # (day, average wpm, best wpm), oldest first
+            "char_errors": char_errors, # (character, total mistakes), most mistyped first
+        }
+
+    def sessions(self, user, limit=20): # the user's most recent sessions (without their keystroke logs)
+        return self.db.execute(
+            "SELECT id, finished_at, difficulty, duration, wpm, accuracy, errors, chars FROM sessions WHERE user = ? ORDER BY finished_at DESC LIMIT ?",
+            (user, limit)).fetchall()
+
+    def keystrokes(self, session_id): # the keystroke log saved with a session (None if it was saved without one)
+        row = self.db.execute("SELECT keystrokes FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return KeystrokeLog.from_bytes(row[0], f"session {session_id}")
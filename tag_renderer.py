@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+# Coalesced Highlight Rendering
+# Turns the per-character "correct"/"incorrect" results from the scoring engine into contiguous runs so that the passage
+# display receives one tag_add per tag instead of one per character, cutting the number of Tcl round-trips per keystroke.
+# For tests of several passages the display is a window over the text: one Tk line per passage, holding the passage being
+# typed, the next one as a preview and the last KEEP_TYPED finished ones. Older lines are deleted as the user moves on, so
+# the widget's size, and the cost of each keystroke, do not depend on how long the whole text is.
+
+KEEP_TYPED = 1 # finished passages kept above the current one
+
+def coalesce_runs(start, tags): # groups consecutive characters with the same tag into (tag, run_start, run_end) runs
+    runs = []
+    run_start = start
+    for offset in range(1, len(tags) + 1):
+        if offset == len(tags) or tags[offset] != tags[offset - 1]: # the current run ends when the tag changes or the characters run out
+            runs.append((tags[offset - 1], run_start, start + offset))
+            run_start = start + offset
+    return runs
+
+
+class TagRenderer: # applies scoring results to a read-only tk.Text widget
+    def __init__(self, text_widget):
+        self.widget = text_widget
+        self.cursor_index = None # position of the yellow "next character" highlight (None when the passage is fully typed)
+        self.line = 1 # Tk line holding the passage being typed
+        self.has_preview = False # whether the line after it holds the next passage
+
+    def index(self, i): # Tk index of character i of the passage being typed
+        return f"{self.line}.{i}"
+
+    def set_text(self, text, preview=None): # replaces the passage shown in the display (and the preview of the next one) with a single normal/disabled toggle
+        self.widget.config(state='normal') # temporarily allows display to be edited
+        self.widget.delete('1.0', 'end') # clears text (and all of its highlights) from previous test
+        self.widget.insert('1.0', text) # places new text into text display window
+        if preview is not None:
+            self.widget.insert('end', "\n" + preview, "upcoming")
+        self.widget.config(state='disabled') # switches display back to read-only format
+        self.cursor_index = None
+        self.line = 1
+        self.has_preview = preview is not None
+
+    def advance(self, preview=None): # moves typing on to the previewed passage (set_text or the last advance must have shown one), shows the passage after it and drops lines that scrolled out of the window
+        self.widget.config(state='normal')
+        if self.cursor_index is not None:
+            self.widget.tag_remove("cursor", self.index(self.cursor_index), self.index(self.cursor_index + 1))
+            self.cursor_index = None
+        self.line += 1
+        self.widget.tag_remove("upcoming", f"{self.line}.0", f"{self.line}.end")
+        if preview is not None:
+            self.widget.insert('end', "\n" + preview, "upcoming")
+        self.has_preview = preview is not None
+        if self.line > KEEP_TYPED + 1: # deletes finished passages above the window, so the widget never holds more than a few lines
+            self.widget.delete('1.0', f"{self.line - KEEP_TYPED}.0")
+            self.line = KEEP_TYPED + 1
+        self.widget.config(state='disabled')
+        self.widget.see(f"{self.line}.0") # scrolls the new passage into view
+
+    def render(self, delta, cursor_index=None): # redraws only the characters in the score delta, plus the cursor
+        # tags can be added and removed while the widget is disabled (the state only blocks inserting and deleting text), so no toggle is needed here
+        if delta.end > delta.start: # clears the old green/red highlights of characters that were deleted or retyped
+            self.widget.tag_remove("correct", self.index(delta.start), self.index(delta.end))
+            self.widget.tag_remove("incorrect", self.index(delta.start), self.index(delta.end))
+
+        ranges = {"correct": [], "incorrect": []}
+        for tag, run_start, run_end in coalesce_runs(delta.start, delta.tags):
+            ranges[tag].extend((self.index(run_start), self.index(run_end)))
+        for tag, indices in ranges.items():
+            if indices: # Tk accepts several index pairs in one tag add, so each tag costs one call however many runs it has
+                self.widget.tag_add(tag, *indices)
+
+        if cursor_index != self.cursor_index: # only moves the yellow cursor when it actually changed position
+            if self.cursor_index is not None:
+                self.widget.tag_remove("cursor", self.index(self.cursor_index), self.index(self.cursor_index + 1))
+            if cursor_index is not None:
+                self.widget.tag_add("cursor", self.index(cursor_index), self.index(cursor_index + 1)) # cursor is added to indicate which letter the user should type next
+                if self.has_preview or self.line > 1: # keeps the cursor in view as the passage wraps past the bottom of the display
+                    self.widget.see(self.index(cursor_index))
+            self.cursor_index = cursor_index
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from keyboard_layout import COLUMN_FINGERS, FINGER_NAMES, KEY_POSITIONS, ROW_NAMES
+from keystroke_log import BACKSPACE_CODE
+
+# Keystroke Error Analytics
+# Works on the keystroke log (see keystroke_log.py) with NumPy array operations instead of Python loops, so that the same
+# analysis stays interactive over tens of thousands of archived keystrokes: an expected-vs-typed confusion matrix, per-bigram
+# error rates, per-key latency distributions, and per-row and per-finger aggregates for the QWERTY heatmaps.
+
+# lookup tables from (ASCII) code point to keyboard row, column and finger (-1 for characters that are not on the layout)
+ROW_OF = np.full(128, -1, dtype=np.int8)
+COLUMN_OF = np.full(128, -1, dtype=np.int8)
+FINGER_OF = np.full(128, -1, dtype=np.int8)
+for _char, (_row, _col) in KEY_POSITIONS.items():
+    for _cp in {ord(_char), ord(_char.lower())}:
+        ROW_OF[_cp], COLUMN_OF[_cp], FINGER_OF[_cp] = _row, _col, COLUMN_FINGERS[_col]
+FINGER_OF[ord(' ')] = len(FINGER_NAMES) - 1
+
+
+def _lookup(table, code_points): # looks code points up in an ASCII table (-1 for anything outside it)
+    inside = code_points < len(table)
+    return np.where(inside, table[np.where(inside, code_points, 0)], -1)
+
+
+def _group_sizes(groups, count): # number of items in each group (groups holds a group index per item)
+    return np.bincount(groups, minlength=count)
+
+
+class KeystrokeAnalysis: # analysis of one or more sessions' keystrokes
+    def __init__(self, time_ns, typed, expected, interval_ns):
+        self.time_ns = time_ns # when each key was pressed
+        self.typed = typed # code point of each key pressed (BACKSPACE_CODE for deletions)
+        self.expected = expected # code point the passage expected at that position (0 past the end of the passage)
+        self.interval_ns = interval_ns # time since the previous key of the same session (-1 for each session's first key)
+        self.previous = np.zeros_like(expected) # passage character before the expected one (0 at the start), set by from_log
+        typing = (typed != BACKSPACE_CODE) & (expected != 0) # keys that typed a passage character (not deletions or overflow)
+        self.typing = typing
+        self.error = typing & (typed != expected)
+
+    @classmethod
+    def from_log(cls, log, target): # analyses a KeystrokeLog recorded against the target passage
+        time_ns = np.frombuffer(log.times, dtype=np.int64) if len(log) else np.zeros(0, dtype=np.int64)
+        typed = np.frombuffer(log.keys, dtype=np.uint32).astype(np.int64) if len(log) else np.zeros(0, dtype=np.int64)
+        positions = np.frombuffer(log.positions, dtype=np.uint32).astype(np.int64) if len(log) else np.zeros(0, dtype=np.int64)
+        target_cp = np.frombuffer(target.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+        in_target = positions < len(target_cp)
+        safe = np.where(in_target, positions, 0)
+        expected = np.where(in_target, target_cp[safe] if len(target_cp) else 0, 0)
+        previous = np.where(in_target & (positions > 0), target_cp[np.maximum(safe - 1, 0)] if len(target_cp) else 0, 0)
+        interval_ns = np.empty_like(time_ns)
+        if len(time_ns):
+            interval_ns[0] = -1
+            interval_ns[1:] = np.diff(time_ns)
+        analysis = cls(time_ns, typed, expected, interval_ns)
+        analysis.previous = previous
+        return analysis
+
+    @classmethod
+    def concatenate(cls, analyses): # combines several sessions into one analysis (intervals never span two sessions)
+        analyses = list(analyses)
+        combined = cls(*(np.concatenate([getattr(a, name) for a in analyses]) if analyses else np.zeros(0, dtype=np.int64)
+                         for name in ('time_ns', 'typed', 'expected', 'interval_ns')))
+        combined.previous = np.concatenate([a.previous for a in analyses]) if analyses else np.zeros(0, dtype=np.int64)
+        return combined
+
+    def __len__(self):
+        return len(self.typed)
+
+    # Errors
+    def confusion_matrix(self): # (characters, matrix) where matrix[i, j] counts times characters[i] was expected and characters[j] typed
+        expected = self.expected[self.typing]
+        typed = self.typed[self.typing]
+        labels = np.unique(np.concatenate((expected, typed)))
+        n = len(labels)
+        cells = np.searchsorted(labels, expected) * n + np.searchsorted(labels, typed)
+        matrix = np.bincount(cells, minlength=n * n).reshape(n, n)
+        return [chr(c) for c in labels], matrix
+
+    def bigram_error_rates(self, min_attempts=1): # [(bigram, attempts, errors, error rate)] for each pair of passage characters, worst first
+        mask = self.typing & (self.previous != 0)
+        codes = (self.previous[mask] << 21) | self.expected[mask] # one integer per bigram (code points fit in 21 bits)
+        if not len(codes):
+            return []
+        bigrams, groups = np.unique(codes, return_inverse=True)
+        attempts = _group_sizes(groups, len(bigrams))
+        errors = np.bincount(groups, weights=self.error[mask], minlength=len(bigrams)).astype(np.int64)
+        rates = errors / attempts
+        keep = np.flatnonzero(attempts >= min_attempts)
+        order = keep[np.lexsort((-attempts[keep], -rates[keep]))]
+        return [(chr(bigrams[i] >> 21) + chr(bigrams[i] & 0x1FFFFF), int(attempts[i]), int(errors[i]), float(rates[i])) for i in order]
+
+    # Latency
+    def key_latencies(self): # {character: (count, mean ms, p50 ms, p90 ms)} for the time taken to reach each passage character
+        mask = self.typing & (self.interval_ns > 0) # pasted text (no time between keys) and each session's first key have no latency
+        chars = self.expected[mask]
+        latency_ms = self.interval_ns[mask] / 1e6
+        if not len(chars):
+            return {}
+        keys, groups = np.unique(chars, return_inverse=True)
+        counts = _group_sizes(groups, len(keys))
+        means = np.bincount(groups, weights=latency_ms, minlength=len(keys)) / counts
+        ordered = latency_ms[np.lexsort((latency_ms, groups))] # latencies sorted within each key's group
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        p50 = ordered[starts + ((counts - 1) * 0.5).astype(np.int64)]
+        p90 = ordered[starts + ((counts - 1) * 0.9).astype(np.int64)]
+        return {chr(k): (int(c), float(m), float(a), float(b)) for k, c, m, a, b in zip(keys, counts, means, p50, p90)}
+
+    # Keyboard Aggregates
+    def _aggregate(self, table, size): # attempts, errors and mean latency (ms) for each group of a lookup table
+        group = _lookup(table, self.expected)
+        mask = self.typing & (group >= 0)
+        attempts = np.bincount(group[mask], minlength=size)
+        errors = np.bincount(group[mask], weights=self.error[mask], minlength=size).astype(np.int64)
+        timed = mask & (self.interval_ns > 0)
+        timed_counts = np.bincount(group[timed], minlength=size)
+        latency = np.bincount(group[timed], weights=self.interval_ns[timed] / 1e6, minlength=size)
+        mean_latency = np.divide(latency, timed_counts, out=np.zeros(size), where=timed_counts > 0)
+        return attempts, errors, mean_latency
+
+    def row_aggregates(self): # {row name: (attempts, errors, mean latency ms)}
+        attempts, errors, latency = self._aggregate(ROW_OF, len(ROW_NAMES))
+        return {name: (int(a), int(e), float(l)) for name, a, e, l in zip(ROW_NAMES, attempts, errors, latency)}
+
+    def finger_aggregates(self): # {finger name: (attempts, errors, mean latency ms)}
+        attempts, errors, latency = self._aggregate(FINGER_OF, len(FINGER_NAMES))
+        return {name: (int(a), int(e), float(l)) for name, a, e, l in zip(FINGER_NAMES, attempts, errors, latency)}
+
+    def heatmaps(self): # (errors, mean latency in ms) as 4x13 QWERTY grids
+        rows = _lookup(ROW_OF, self.expected)
+        cols = _lookup(COLUMN_OF, self.expected)
+        mask = self.typing & (rows >= 0)
+        cells = rows[mask] * 13 + cols[mask]
+        errors = np.bincount(cells, weights=self.error[mask], minlength=4 * 13).reshape(4, 13)
+        timed = mask & (self.interval_ns > 0)
+        timed_cells = rows[timed] * 13 + cols[timed]
+        timed_counts = np.bincount(timed_cells, minlength=4 * 13)
+        latency = np.bincount(timed_cells, weights=self.interval_ns[timed] / 1e6, minlength=4 * 13)
+        mean_latency = np.divide(latency, timed_counts, out=np.zeros(4 * 13), where=timed_counts > 0).reshape(4, 13)
+        return errors, mean_latency
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict, namedtuple
+
+# Incremental Keystroke Scoring
+# Instead of re-scoring the whole typed prefix on every key release, the engine remembers what was typed last time,
+# works out which characters actually changed (append, backspace, paste, or replacing a selection) and only scores those.
+
+ScoreDelta = namedtuple("ScoreDelta", ["start", "end", "tags"]) # previously typed characters from start to end need their old tags cleared; tags holds the new "correct"/"incorrect" tag for each character typed from start onwards
+
+
+def common_prefix_length(a, b): # finds how many leading characters two strings share
+    limit = min(len(a), len(b))
+    if a[:limit] == b[:limit]: # the usual case (typing or deleting at the end) is settled by one comparison
+        return limit
+    low, high = 0, limit # otherwise binary searches for the first difference using slice comparisons, which run in C rather than a Python loop
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class ScoringEngine: # keeps the scoring state for one passage
+    def __init__(self, target_text="", mistype_counter=None):
+        self.character_mistype = mistype_counter if mistype_counter is not None else defaultdict(int) # tracks number of times user incorrectly types a particular character
+        self.reset(target_text)
+
+    def reset(self, target_text): # starts scoring a new passage
+        self.target = target_text # what the user should type for full accuracy
+        self.typed = "" # what the user had typed as of the last key event
+        self.errors = 0 # number of characters currently typed incorrectly (including anything typed past the end of the passage)
+
+    def _tag_for(self, i, char): # decides whether a character typed at position i is correct
+        return "correct" if i < len(self.target) and char == self.target[i] else "incorrect"
+
+    def update(self, typed_text): # scores a new snapshot of the typed text and returns what changed
+        old_text = self.typed
+        if typed_text == old_text: # key releases that did not change the text (shift, arrows, etc.) cost nothing and are not counted twice
+            return ScoreDelta(len(old_text), len(old_text), [])
+
+        start = common_prefix_length(old_text, typed_text) # everything before this position is unchanged
+        end = len(old_text) # only characters that were already typed carry tags that need clearing
+
+        for i in range(start, len(old_text)): # removes the errors of characters that were deleted or replaced
+            if self._tag_for(i, old_text[i]) == "incorrect":
+                self.errors -= 1
+
+        tags = []
+        for i in range(start, len(typed_text)): # scores only the characters that were newly typed
+            tag = self._tag_for(i, typed_text[i])
+            if tag == "incorrect":
+                self.errors += 1
+                if i < len(self.target):
+                    self.character_mistype[self.target[i]] += 1 # captures error against the character the user should have typed
+            tags.append(tag)
+
+        self.typed = typed_text
+        return ScoreDelta(start, end, tags)
+
+    @property
+    def position(self): # number of passage characters the user has covered so far
+        return min(len(self.typed), len(self.target))
+
+    @property
+    def finished(self):
+        return len(self.typed) >= len(self.target)
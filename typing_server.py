@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+from collections import deque
+
+from python_typing_test import retrieve_quotation, stream_quotation
+from session_history import SessionHistory
+from typing_session import BACKSPACE, TypingSession
+
+# Multi-Session Typing Server
+# Runs many typing tests at once on one asyncio event loop, one TypingSession per connection, so that a classroom or a
+# competition can share a single process. Clients send keystrokes over a local socket (TCP or a Unix socket) as
+# newline-delimited JSON, get each key acknowledged with their position and error count, and can subscribe to a live
+# leaderboard pushed once a second. Scoring follows the desktop test: paragraphs are typed one after another, a test
+# ends after its last paragraph (or when the client ends it) and the results use the same wpm and accuracy formulas,
+# counting only what was actually typed. Tests typed for less than MIN_RANKED_SECONDS stay off the leaderboard and history.
+#
+# Client messages:                                                Server messages:
+#   {"op": "join", "name": ..., "difficulty": "medium",            {"op": "passage", "text": ..., "index": n, "last": bool}
+#    "paragraphs": 3 (or "long": true)}
+#   {"op": "key", "key": "a" or "BackSpace", "seq": n}             {"op": "ack", "seq": n, "position": p, "errors": e}
+#   {"op": "end"}                                                  {"op": "results", "wpm": ..., "accuracy": ..., ...}
+#   {"op": "leaderboard"}  (subscribes to updates)                 {"op": "leaderboard", "entries": [...]}
+#                                                                  {"op": "error", "message": ...}
+
+HOST = "127.0.0.1"
+PORT = 8765
+LEADERBOARD_INTERVAL = 1.0 # seconds between leaderboard updates
+LEADERBOARD_SIZE = 10 # typists shown on the leaderboard
+FINISHED_KEPT = 1000 # finished tests that stay on the leaderboard after their typist disconnects
+HIGH_WATER = 64 * 1024 # bytes a client may leave unread before the server waits for it (or skips its leaderboard updates)
+MAX_PARAGRAPHS = 20 # most paragraphs a client may ask for in one test
+MAX_NAME = 40 # longest typist name kept (longer names are cut)
+DIFFICULTIES = ("easy", "medium", "hard")
+MIN_RANKED_SECONDS = 5 # typing time a test needs before it goes on the leaderboard (or into the history)
+
+
+class ServerSession: # one typist's test, isolated from every other connection
+    def __init__(self, session_id, name, passages, difficulty="medium"):
+        self.id = session_id
+        self.name = name
+        self.difficulty = difficulty
+        self.passages = iter(passages)
+        self.test = next(self.passages) # paragraph being typed
+        self.upcoming = next(self.passages, None) # paragraph after it (None for the last paragraph of a test)
+        self.index = 0
+        self.session = TypingSession(self.test)
+        self.total_errors = 0 # mistakes in the paragraphs finished so far
+        self.results = None # final results once the test has ended
+
+    @property
+    def ended(self):
+        return self.results is not None
+
+    @property
+    def ranked(self): # whether the test has been typed for long enough to be compared with others
+        return self.session.events > 0 and self.session.elapsed() >= MIN_RANKED_SECONDS
+
+    @property
+    def typed_chars(self): # characters of the test covered so far (a paragraph that was cut short counts only as far as it was typed)
+        return self.session.offset + self.session.position
+
+    def press(self, key): # scores one key; returns "passage" if it moved on to the next paragraph, "results" if it ended the test, else None
+        self.session.press(key)
+        if not self.session.finished:
+            return None
+        if self.upcoming is None: # the test ends automatically after its last paragraph
+            self.end()
+            return "results"
+        self.total_errors += self.session.errors
+        self.test, self.upcoming = self.upcoming, next(self.passages, None)
+        self.index += 1
+        self.session.advance(self.test)
+        return "passage"
+
+    def end(self): # stops the test and works out its results
+        if self.results is None:
+            self.session.finish()
+            self.total_errors += self.session.errors
+            chars = self.typed_chars
+            time_taken = self.session.elapsed() # the results use the desktop test's formulas, over what was actually typed
+            self.results = {
+                "wpm": (self.session.words / time_taken) * 60 if time_taken else 0,
+                "accuracy": ((chars - self.total_errors) / chars) * 100 if chars else 0,
+                "errors": self.total_errors,
+                "chars": chars,
+                "duration": time_taken,
+                "ranked": self.ranked,
+                "highest": self.session.wpm_tracker.highest,
+                "average": self.session.wpm_tracker.average,
+            }
+        return self.results
+
+    def live_wpm(self):
+        if not self.ranked: # a few keys over a few milliseconds would otherwise top the leaderboard
+            return 0
+        return self.results["wpm"] if self.results else (self.session.wpm() or 0)
+
+    def standing(self): # this typist's leaderboard entry
+        typed = self.typed_chars
+        errors = self.total_errors + self.session.errors
+        return {
+            "name": self.name,
+            "wpm": round(self.live_wpm(), 1),
+            "accuracy": round(self.results["accuracy"] if self.results else ((typed - errors) / typed * 100 if typed else 0), 1),
+            "chars": typed,
+            "finished": self.ended,
+        }
+
+    def passage_message(self):
+        return {"op": "passage", "text": self.test, "index": self.index, "last": self.upcoming is None}
+
+
+class TypingServer: # accepts connections and keeps every session and the leaderboard
+    def __init__(self, history=None):
+        self.sessions = {} # session id -> ServerSession, for connected typists and recently finished tests
+        self.finished = deque() # ids of finished tests, oldest first, so that only FINISHED_KEPT of them are kept
+        self.subscribers = set() # writers of connections that asked for the leaderboard
+        self.history = history # SessionHistory that finished tests are saved to (None to keep nothing)
+        self.ids = itertools.count(1)
+        self.events = 0 # keys scored since the server started
+
+    def leaderboard(self): # the fastest typists, live or finished, that have typed for at least MIN_RANKED_SECONDS
+        return [s.standing() for s in heapq.nlargest(LEADERBOARD_SIZE, (s for s in self.sessions.values() if s.ranked), key=ServerSession.live_wpm)]
+
+    async def publish_leaderboard(self): # pushes the leaderboard to every subscriber once a second
+        while True:
+            await asyncio.sleep(LEADERBOARD_INTERVAL)
+            if not self.subscribers:
+                continue
+            line = encode({"op": "leaderboard", "entries": self.leaderboard(), "typists": len(self.sessions)})
+            for writer in list(self.subscribers):
+                if writer.is_closing():
+                    self.subscribers.discard(writer)
+                elif writer.transport.get_write_buffer_size() < HIGH_WATER: # a client that is not reading misses updates rather than holding up the others
+                    writer.write(line)
+
+    def finish(self, state): # keeps a finished test on the leaderboard (and in the history) after its typist leaves
+        results = state.end()
+        if not results["ranked"]: # too short to compare with others, so the client gets its results but nothing is kept
+            self.sessions.pop(state.id, None)
+        elif state.id not in self.finished:
+            self.finished.append(state.id)
+            while len(self.finished) > FINISHED_KEPT:
+                self.sessions.pop(self.finished.popleft(), None)
+            if self.history is not None:
+                self.history.record(state.name, results["wpm"], results["accuracy"], results["errors"], results["chars"], results["duration"],
+                                    state.session.full_text, state.session.character_mistype, state.session.keystrokes, state.difficulty)
+        return dict(results, op="results")
+
+    def join(self, message): # starts a new test for a client (raises ValueError, with a message for the client, if the request is not valid)
+        name = message.get("name", "typist")
+        difficulty = message.get("difficulty", "medium")
+        paragraphs = message.get("paragraphs", 3)
+        if not isinstance(name, str):
+            raise ValueError("name must be a string")
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+        if message.get("long"): # paragraphs keep coming until the client ends the test
+            passages = stream_quotation(difficulty=difficulty)
+        elif isinstance(paragraphs, int) and not isinstance(paragraphs, bool) and 1 <= paragraphs <= MAX_PARAGRAPHS:
+            passages = retrieve_quotation(num_paragraphs=paragraphs, difficulty=difficulty)
+        else:
+            raise ValueError(f"paragraphs must be a whole number from 1 to {MAX_PARAGRAPHS}")
+        state = ServerSession(next(self.ids), name[:MAX_NAME], (text for text, words in passages), difficulty)
+        self.sessions[state.id] = state
+        return state
+
+    async def handle(self, reader, writer): # serves one connection until it closes
+        state = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError): # a line longer than the stream's limit is dropped rather than ending the connection
+                    writer.write(encode({"op": "error", "message": "message too long"}))
+                    continue
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    op = message["op"]
+                except (ValueError, KeyError, TypeError):
+                    writer.write(encode({"op": "error", "message": "expected a JSON object with an \"op\""}))
+                    continue
+
+                if op == "key":
+                    if state is None or state.ended:
+                        writer.write(encode({"op": "error", "message": "no test running; send join first"}))
+                        continue
+                    key = message.get("key", "")
+                    if not isinstance(key, str) or (key != BACKSPACE and len(key) != 1):
+                        writer.write(encode({"op": "error", "message": f"unknown key {key!r}"}))
+                        continue
+                    outcome = state.press(key)
+                    self.events += 1
+                    writer.write(encode({"op": "ack", "seq": message.get("seq"), "position": state.session.position, "errors": state.total_errors + state.session.errors}))
+                    if outcome == "passage":
+                        writer.write(encode(state.passage_message()))
+                    elif outcome == "results":
+                        writer.write(encode(self.finish(state)))
+                elif op == "join":
+                    if state is not None and not state.ended: # starting again abandons the previous test
+                        self.sessions.pop(state.id, None)
+                    try:
+                        state = self.join(message)
+                    except ValueError as e:
+                        state = None
+                        writer.write(encode({"op": "error", "message": str(e)}))
+                    else:
+                        writer.write(encode(state.passage_message()))
+                elif op == "end":
+                    if state is None:
+                        writer.write(encode({"op": "error", "message": "no test running; send join first"}))
+                    else:
+                        writer.write(encode(self.finish(state)))
+                elif op == "leaderboard":
+                    self.subscribers.add(writer)
+                    writer.write(encode({"op": "leaderboard", "entries": self.leaderboard(), "typists": len(self.sessions)}))
+                else:
+                    writer.write(encode({"op": "error", "message": f"unknown op {op!r}"}))
+
+                if writer.transport.get_write_buffer_size() > HIGH_WATER: # only waits when the client falls behind reading
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            if state is not None and not state.ended: # an unfinished test leaves with its typist
+                self.sessions.pop(state.id, None)
+            writer.close()
+
+
+def encode(message): # one newline-delimited JSON message
+    return (json.dumps(message, separators=(',', ':')) + "\n").encode('utf-8')
+
+
+async def serve(host=HOST, port=PORT, unix_path=None, history_path=None): # runs the server until it is cancelled
+    history = SessionHistory(history_path) if history_path else None
+    typing_server = TypingServer(history)
+    if unix_path:
+        server = await asyncio.start_unix_server(typing_server.handle, unix_path)
+    else:
+        server = await asyncio.start_server(typing_server.handle, host, port)
+    publisher = asyncio.create_task(typing_server.publish_leaderboard())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        publisher.cancel()
+        if history is not None:
+            history.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hosts many typing tests at once over a local socket.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--history", default=None, help="SQLite file to save finished tests to (e.g. typing_history.sqlite3)")
+    args = parser.parse_args()
+
+    print(f"typing server listening on {args.unix or f'{args.host}:{args.port}'}", flush=True)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.history))
+    except KeyboardInterrupt:
+        pass
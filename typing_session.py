@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import time
+from collections import defaultdict, deque
+
+from keystroke_log import KeystrokeLog
+from typing_engine import ScoringEngine
+
+# Headless Typing Session
+# Holds all of the scoring state for one typing test (timing, errors, wpm samples, mistyped characters) without touching Tk,
+# so that tests can be scored, replayed and measured without a display. PythonTypingTestApp is a view over one of these.
+
+BACKSPACE = "BackSpace" # key name used for deleting the last typed character (matches Tk's keysym)
+WPM_WINDOW = 10 # number of one-second samples the rolling wpm is measured over
+WPM_HISTORY = 3600 # number of wpm samples kept for charts (an hour of one-second ticks)
+
+
+def count_word_starts(text, start, end): # counts positions in text[start:end] where a word begins (a non-space after a space or at the very start)
+    count = 0
+    previous_is_space = start == 0 or text[start - 1].isspace()
+    for i in range(start, end):
+        is_space = text[i].isspace()
+        if previous_is_space and not is_space:
+            count += 1
+        previous_is_space = is_space
+    return count
+
+
+class RollingWPM: # streaming wpm over the last few seconds, kept in fixed-size ring buffers so each tick costs the same
+    def __init__(self, window=WPM_WINDOW, history=WPM_HISTORY):
+        self.samples = deque(maxlen=window + 1) # (timestamp, words typed) at each of the last window ticks
+        self.history = deque(maxlen=history) # most recent rolling wpm values (older ones drop off the front)
+        self.highest = 0 # highest rolling wpm reached during the test
+        self.total = 0 # sum and count of every rolling wpm value, so the average covers the whole test even after history wraps
+        self.count = 0
+
+    def __len__(self):
+        return len(self.history)
+
+    def __iter__(self):
+        return iter(self.history)
+
+    def clear(self):
+        self.samples.clear()
+        self.history.clear()
+        self.highest = 0
+        self.total = 0
+        self.count = 0
+
+    def add(self, timestamp, words): # records the word count at one tick and returns the rolling wpm (None until two ticks exist)
+        self.samples.append((timestamp, words))
+        oldest_time, oldest_words = self.samples[0]
+        elapsed_minutes = (timestamp - oldest_time) / 60
+        if elapsed_minutes <= 0:
+            return None
+        wpm = (words - oldest_words) / elapsed_minutes
+        self.history.append(wpm)
+        self.highest = max(self.highest, wpm)
+        self.total += wpm
+        self.count += 1
+        return wpm
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0
+
+
+class TypingSession: # consumes timestamped keystroke events for a test of one or more passages, typed one after another
+    def __init__(self, target_text="", mistype_counter=None, clock=time.time):
+        self.clock = clock # source of timestamps for events that do not bring their own
+        self.character_mistype = mistype_counter if mistype_counter is not None else defaultdict(int) # tracks number of times user incorrectly types a particular character
+        self.scorer = ScoringEngine(mistype_counter=self.character_mistype)
+        self.keystrokes = KeystrokeLog() # per-keystroke timing record for latency, burst and hesitation analysis
+        self.wpm_tracker = RollingWPM()
+        self.reset(target_text)
+
+    def reset(self, target_text): # clears prior attempt and starts a fresh session for a new passage
+        self.target = target_text # what the user should type for full accuracy
+        self.passages = [target_text] # every passage of the test so far, the current one last
+        self.offset = 0 # number of characters in the earlier passages (keystroke log positions count from the start of the first passage)
+        self.scorer.reset(target_text)
+        self.start_time = None # time of the first keystroke (None until the user starts typing)
+        self.last_time = None # time of the most recent keystroke
+        self.end_time = None # time the session was finished (None while it is still running)
+        self.events = 0 # number of keystroke events consumed
+        self.words = 0 # number of words typed so far, updated from each keystroke's delta rather than by splitting the typed text
+        self.wpm_tracker.clear() # tracks rolling words per minute (wpm) values as they change throughout a given test
+        self.keystrokes.clear()
+
+    def advance(self, target_text): # moves on to the next passage of the same test, keeping the clock, word count, wpm tracker and keystroke log
+        self.offset += len(self.target)
+        self.target = target_text
+        self.passages.append(target_text)
+        self.scorer.reset(target_text) # the typed text starts again from empty, so scoring work stays proportional to one passage
+
+    # Keystroke Events
+    def feed(self, typed_text, timestamp=None): # scores a new snapshot of the typed text (what the hidden input holds after a key event)
+        if timestamp is None:
+            time_ns = time.perf_counter_ns() # the keystroke log always uses the high-resolution clock for live typing
+            timestamp = self.clock()
+        else:
+            time_ns = round(timestamp * 1_000_000_000) # replayed events keep their own timeline
+        if self.start_time is None: # the timer starts with the first keystroke
+            self.start_time = timestamp
+        self.last_time = timestamp
+        self.events += 1
+        old_text = self.scorer.typed
+        delta = self.scorer.update(typed_text)
+        self.words += count_word_starts(typed_text, delta.start, len(typed_text)) - count_word_starts(old_text, delta.start, len(old_text)) # only the changed tail can add or remove words
+        self.keystrokes.record_delta(time_ns, old_text, typed_text, delta.start, self.offset)
+        return delta
+
+    def press(self, key, timestamp=None): # applies a single key (a character or BACKSPACE) to the typed text and scores it
+        typed = self.scorer.typed
+        typed = typed[:-1] if key == BACKSPACE else typed + key
+        return self.feed(typed, timestamp)
+
+    def sample_wpm(self, timestamp=None): # records the rolling wpm (called once per second while the test runs; nothing is recorded before the first keystroke)
+        if self.start_time is None:
+            return None
+        return self.wpm_tracker.add(self.clock() if timestamp is None else timestamp, self.words)
+
+    def finish(self, timestamp=None): # stops the session clock
+        if self.end_time is None:
+            self.end_time = self.clock() if timestamp is None else timestamp
+        return self.end_time
+
+    # Statistics
+    @property
+    def typed(self):
+        return self.scorer.typed
+
+    @property
+    def errors(self): # number of characters currently typed incorrectly
+        return self.scorer.errors
+
+    @property
+    def position(self): # number of passage characters the user has covered so far
+        return self.scorer.position
+
+    @property
+    def finished(self): # True once every character of the passage has been typed
+        return self.scorer.finished
+
+    @property
+    def full_text(self): # every passage of the test so far, as the single text the keystroke log positions refer to
+        return "".join(self.passages)
+
+    @property
+    def progress(self): # percentage of the passage the user has typed
+        return (self.position / len(self.target)) * 100 if self.target else 0
+
+    def elapsed(self, timestamp=None): # seconds since the first keystroke
+        if self.start_time is None:
+            return 0
+        if timestamp is None:
+            timestamp = self.end_time if self.end_time is not None else self.clock()
+        return timestamp - self.start_time
+
+    def wpm(self, timestamp=None): # words typed so far per minute (None before any time has passed)
+        elapsed_minutes = self.elapsed(timestamp) / 60
+        if elapsed_minutes <= 0:
+            return None
+        return self.words / elapsed_minutes
+
+    def accuracy(self): # percentage of the passage's characters that were not mistyped
+        total = len(self.target)
+        return ((total - self.errors) / total) * 100 if total else 0